@@ -77,7 +77,7 @@ def upgrade() -> None:
         sa.Column('created_at', sa.DateTime(timezone=True), 
                  nullable=False, server_default=sa.func.now()),
         sa.Column('updated_at', sa.DateTime(timezone=True), 
-                 nullable=False, server_default=sa.func.now(), onupdate=sa.func.now()),
+                 nullable=False, server_default=sa.func.now()),
     )
     
     # Create indexes for better query performance
@@ -102,7 +102,7 @@ def upgrade() -> None:
         sa.Column('created_at', sa.DateTime(timezone=True), 
                  nullable=False, server_default=sa.func.now()),
         sa.Column('updated_at', sa.DateTime(timezone=True), 
-                 nullable=False, server_default=sa.func.now(), onupdate=sa.func.now()),
+                 nullable=False, server_default=sa.func.now()),
     )
     
     # Add template relationship to processed_scans
@@ -6,7 +6,6 @@ Revises: 002_add_jsonb_fields
 Create Date: 2025-05-29 15:00:00.000000
 """
 from alembic import op
-import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = '003_add_name_curp_columns'
@@ -16,8 +15,12 @@ depends_on = None
 
 def upgrade() -> None:
     """Add name and curp_value columns to scans table"""
-    op.add_column('scans', sa.Column('name', sa.String(length=255), nullable=True))
-    op.add_column('scans', sa.Column('curp_value', sa.String(length=18), nullable=True))
+    # One ALTER TABLE holds the table lock once for both columns
+    op.execute(
+        "ALTER TABLE scans "
+        "ADD COLUMN name VARCHAR(255), "
+        "ADD COLUMN curp_value VARCHAR(18)"
+    )
     op.create_index('idx_scans_name', 'scans', ['name'])
     op.create_index('idx_scans_curp_value', 'scans', ['curp_value'])
 
@@ -25,5 +28,4 @@ def downgrade() -> None:
     """Remove name and curp_value columns from scans table"""
     op.drop_index('idx_scans_curp_value', table_name='scans')
     op.drop_index('idx_scans_name', table_name='scans')
-    op.drop_column('scans', 'curp_value')
-    op.drop_column('scans', 'name')
\ No newline at end of file
+    op.execute("ALTER TABLE scans DROP COLUMN curp_value, DROP COLUMN name")
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""Add GIN (jsonb_path_ops) indexes on scans.answers and scans.regions
+
+Revision ID: 005_add_jsonb_gin_indexes
+Revises: 004_add_exam_id_and_unique_constraint
+Create Date: 2025-06-02 12:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005_add_jsonb_gin_indexes'
+down_revision = '004_add_exam_id_and_unique_constraint'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    """Index JSONB columns for @> containment lookups (image_quality is rarely queried)"""
+    op.create_index(
+        'idx_scans_answers_gin', 'scans', ['answers'],
+        postgresql_using='gin',
+        postgresql_ops={'answers': 'jsonb_path_ops'}
+    )
+    op.create_index(
+        'idx_scans_regions_gin', 'scans', ['regions'],
+        postgresql_using='gin',
+        postgresql_ops={'regions': 'jsonb_path_ops'}
+    )
+
+def downgrade() -> None:
+    """Drop JSONB GIN indexes"""
+    op.drop_index('idx_scans_regions_gin', table_name='scans')
+    op.drop_index('idx_scans_answers_gin', table_name='scans')
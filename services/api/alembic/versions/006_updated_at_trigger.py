@@ -0,0 +1,38 @@
+"""Maintain updated_at with a BEFORE UPDATE trigger instead of ORM onupdate
+
+Revision ID: 006_updated_at_trigger
+Revises: 005_add_jsonb_gin_indexes
+Create Date: 2025-06-03 09:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006_updated_at_trigger'
+down_revision = '005_add_jsonb_gin_indexes'
+branch_labels = None
+depends_on = None
+
+# Tables carrying an updated_at audit column
+TABLES = ('processed_scans', 'exam_templates')
+
+def upgrade() -> None:
+    """Create set_updated_at() and attach it to every table with updated_at"""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        op.execute(
+            f"CREATE TRIGGER trg_{table}_updated_at BEFORE UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION set_updated_at()"
+        )
+
+def downgrade() -> None:
+    """Drop the updated_at triggers and function"""
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_updated_at ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS set_updated_at()")
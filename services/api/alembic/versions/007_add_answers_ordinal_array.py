@@ -0,0 +1,34 @@
+"""Add scans.answers_ord SMALLINT[] (0=A, 1=B, ...) and backfill it from JSONB answers
+
+Revision ID: 007_add_answers_ordinal_array
+Revises: 006_updated_at_trigger
+Create Date: 2025-06-03 11:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '007_add_answers_ordinal_array'
+down_revision = '006_updated_at_trigger'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    """Add the compact ordinal column; JSONB answers is kept until the backfill is verified"""
+    op.add_column('scans', sa.Column('answers_ord', postgresql.ARRAY(sa.SmallInteger), nullable=True))
+    # Unrecognized marks (blank, multiple, non-letter) become -1
+    op.execute("""
+        UPDATE scans SET answers_ord = (
+            SELECT array_agg(
+                CASE WHEN value ~ '^[A-E]$' THEN ascii(value) - 65 ELSE -1 END
+                ORDER BY ordinality
+            )::smallint[]
+            FROM jsonb_array_elements_text(answers) WITH ORDINALITY
+        )
+        WHERE jsonb_typeof(answers) = 'array'
+    """)
+
+def downgrade() -> None:
+    """Remove the ordinal answers column"""
+    op.drop_column('scans', 'answers_ord')
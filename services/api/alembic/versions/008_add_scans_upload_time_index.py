@@ -0,0 +1,30 @@
+"""Add a newest-first covering index on scans.upload_time for scan listings
+
+Revision ID: 008_add_scans_upload_time_index
+Revises: 007_add_answers_ordinal_array
+Create Date: 2025-06-03 13:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_add_scans_upload_time_index'
+down_revision = '007_add_answers_ordinal_array'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    """Serve ORDER BY upload_time DESC listings from the index instead of a seq scan + sort"""
+    op.create_index(
+        'ix_scans_upload_time',
+        'scans',
+        [sa.text('upload_time DESC')],
+        postgresql_include=['id', 'filename', 'status', 'score', 'total_questions']
+    )
+    # Superseded ascending index created by init_bubblegrade.sql
+    op.execute("DROP INDEX IF EXISTS idx_scans_upload_time")
+
+def downgrade() -> None:
+    """Restore the plain ascending upload_time index"""
+    op.create_index('idx_scans_upload_time', 'scans', ['upload_time'])
+    op.drop_index('ix_scans_upload_time', table_name='scans')
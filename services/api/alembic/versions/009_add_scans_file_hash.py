@@ -0,0 +1,25 @@
+"""Add scans.file_hash (raw 32-byte digest) for duplicate upload detection
+
+Revision ID: 009_add_scans_file_hash
+Revises: 008_add_scans_upload_time_index
+Create Date: 2025-06-04 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '009_add_scans_file_hash'
+down_revision = '008_add_scans_upload_time_index'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    """Add the BYTEA digest column and its lookup index"""
+    op.add_column('scans', sa.Column('file_hash', postgresql.BYTEA, nullable=True))
+    op.create_index('idx_scans_file_hash', 'scans', ['file_hash'])
+
+def downgrade() -> None:
+    """Remove the file hash column"""
+    op.drop_index('idx_scans_file_hash', table_name='scans')
+    op.drop_column('scans', 'file_hash')
@@ -0,0 +1,29 @@
+"""Add a (status, upload_time DESC) index on scans for status-filtered listings
+
+Revision ID: 010_add_scans_status_upload_time_index
+Revises: 009_add_scans_file_hash
+Create Date: 2025-06-05 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_add_scans_status_upload_time_index'
+down_revision = '009_add_scans_file_hash'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    """Serve WHERE status = :s ORDER BY upload_time DESC LIMIT :n pages straight from the index"""
+    op.create_index(
+        'ix_scans_status_upload_time',
+        'scans',
+        ['status', sa.text('upload_time DESC')]
+    )
+    # Leading column of the composite index; the single-column index is redundant
+    op.execute("DROP INDEX IF EXISTS idx_scans_status")
+
+def downgrade() -> None:
+    """Restore the single-column status index"""
+    op.create_index('idx_scans_status', 'scans', ['status'])
+    op.drop_index('ix_scans_status_upload_time', table_name='scans')
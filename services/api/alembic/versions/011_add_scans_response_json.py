@@ -0,0 +1,23 @@
+"""Add scans.response_json, the API representation materialized when a scan is processed
+
+Revision ID: 011_add_scans_response_json
+Revises: 010_add_scans_status_upload_time_index
+Create Date: 2025-06-05 11:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '011_add_scans_response_json'
+down_revision = '010_add_scans_status_upload_time_index'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    """Add the nullable snapshot column; rows processed before this fall back to entity rendering"""
+    op.add_column('scans', sa.Column('response_json', postgresql.JSONB, nullable=True))
+
+def downgrade() -> None:
+    """Remove the response snapshot column"""
+    op.drop_column('scans', 'response_json')
@@ -0,0 +1,53 @@
+"""Drop the legacy scans.answers JSONB; answers_ord is the only stored form of the answers
+
+Revision ID: 012_drop_scans_answers_jsonb
+Revises: 011_add_scans_response_json
+Create Date: 2025-06-06 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '012_drop_scans_answers_jsonb'
+down_revision = '011_add_scans_response_json'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    """Backfill any rows still missing ordinals, then move the GIN index onto answers_ord"""
+    # Same mapping as 007: unrecognized marks (blank, multiple, non-letter) become -1
+    op.execute("""
+        UPDATE scans SET answers_ord = (
+            SELECT array_agg(
+                CASE WHEN value ~ '^[A-E]$' THEN ascii(value) - 65 ELSE -1 END
+                ORDER BY ordinality
+            )::smallint[]
+            FROM jsonb_array_elements_text(answers) WITH ORDINALITY
+        )
+        WHERE answers_ord IS NULL AND jsonb_typeof(answers) = 'array'
+    """)
+    op.drop_index('idx_scans_answers_gin', table_name='scans')
+    op.drop_column('scans', 'answers')
+    # Default array_ops: @> containment over the ordinals, as jsonb_path_ops served the letters
+    op.create_index('idx_scans_answers_ord_gin', 'scans', ['answers_ord'], postgresql_using='gin')
+
+def downgrade() -> None:
+    """Restore the letter list from the ordinals (-1 back to '') and its GIN index"""
+    op.drop_index('idx_scans_answers_ord_gin', table_name='scans')
+    op.add_column('scans', sa.Column('answers', postgresql.JSONB, nullable=True))
+    op.execute("""
+        UPDATE scans SET answers = (
+            SELECT jsonb_agg(
+                CASE WHEN o BETWEEN 0 AND 4 THEN chr(o + 65) ELSE '' END
+                ORDER BY ordinality
+            )
+            FROM unnest(answers_ord) WITH ORDINALITY AS t(o, ordinality)
+        )
+        WHERE answers_ord IS NOT NULL
+    """)
+    op.create_index(
+        'idx_scans_answers_gin', 'scans', ['answers'],
+        postgresql_using='gin',
+        postgresql_ops={'answers': 'jsonb_path_ops'}
+    )
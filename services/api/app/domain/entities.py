@@ -1,58 +1,59 @@
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, asdict
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from uuid import UUID
-from enum import Enum
+from typing import Optional, List, Dict, Any, Iterable
+from enum import StrEnum
 
 
-class ScanStatus(Enum):
-    QUEUED = "QUEUED"
-    PROCESSING = "PROCESSING"
-    COMPLETED = "COMPLETED"
-    ERROR = "ERROR"
+# Answers are held as ordinals (0=A, 1=B, ...); letters only appear at display/export time
+ANSWER_CHOICES = "ABCDE"
+BLANK_ANSWER = -1
+_ANSWER_ORDINALS = {choice: i for i, choice in enumerate(ANSWER_CHOICES)}
 
 
-@dataclass
-class Scan:
-    id: UUID
-    filename: str
-    status: ScanStatus
-    upload_time: datetime
-    score: Optional[int] = None
-    answers: Optional[List[str]] = None
-    total_questions: Optional[int] = None
-    processed_time: Optional[datetime] = None
-    error_message: Optional[str] = None
+def _answer_ordinal(answer: Any) -> int:
+    if answer is None or answer == "":
+        return BLANK_ANSWER
+    ordinal = _ANSWER_ORDINALS.get(answer) if isinstance(answer, str) else None
+    if ordinal is None:
+        raise ValueError(f"Unexpected answer {answer!r}; expected one of {ANSWER_CHOICES!r} or '' for blank")
+    return ordinal
 
-    def is_completed(self) -> bool:
-        return self.status == ScanStatus.COMPLETED
 
-    def is_processing(self) -> bool:
-        return self.status == ScanStatus.PROCESSING
+def encode_answers(answers: Optional[Iterable[Any]]) -> Optional[array]:
+    """
+    Convert answer letters to a signed-byte ordinal array; '' or None (blank) becomes
+    BLANK_ANSWER. Anything else raises ValueError rather than being stored as a blank.
+    """
+    if answers is None:
+        return None
+    return array('b', [_answer_ordinal(a) for a in answers])
 
-    def mark_as_processing(self) -> None:
-        self.status = ScanStatus.PROCESSING
 
-    def mark_as_completed(self, score: int, answers: List[str], total_questions: int) -> None:
-        self.status = ScanStatus.COMPLETED
-        self.score = score
-        self.answers = answers
-        self.total_questions = total_questions
-        self.processed_time = datetime.utcnow()
+def decode_answers(ordinals: Optional[Iterable[int]]) -> Optional[List[str]]:
+    """Convert answer ordinals back to letters; blanks become an empty string"""
+    if ordinals is None:
+        return None
+    return [ANSWER_CHOICES[o] if 0 <= o < len(ANSWER_CHOICES) else "" for o in ordinals]
 
-    def mark_as_error(self, error_message: str) -> None:
-        self.status = ScanStatus.ERROR
-        self.error_message = error_message
+
+class ScanStatus(StrEnum):
+    """Scan lifecycle status; members are plain strings, so no .value lookup is needed"""
+    QUEUED = "QUEUED"
+    PROCESSING = "PROCESSING"
+    COMPLETED = "COMPLETED"
+    NEEDS_REVIEW = "NEEDS_REVIEW"
+    ERROR = "ERROR"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OMRResult:
     score: int
     answers: List[str]
     total_questions: int
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class WebSocketMessage:
     type: str
     scan_id: str
@@ -60,8 +61,8 @@ class WebSocketMessage:
     score: Optional[int] = None
     answers: Optional[List[str]] = None
     error: Optional[str] = None
-    
-@dataclass
+
+@dataclass(slots=True)
 class RegionBoundingBox:
     """Bounding box for a detected document region"""
     x: int
@@ -69,19 +70,74 @@ class RegionBoundingBox:
     width: int
     height: int
 
-@dataclass
+@dataclass(slots=True)
 class ProcessedScan:
     """Domain entity representing a fully processed document scan"""
     id: Any
     filename: str
     status: ScanStatus
-    upload_time: datetime
-    regions: Optional[Dict[str, RegionBoundingBox]] = None
+    # Timestamps are filled by the database (server defaults / RETURNING)
+    upload_time: Optional[datetime] = None
+    regions: Optional[Dict[str, Any]] = None
     score: Optional[int] = None
-    answers: Optional[Any] = None
+    # One signed byte per question instead of a list of str/int objects
+    answers: Optional[array] = None
     total_questions: Optional[int] = None
     nombre: Optional[Dict[str, Any]] = None
     curp: Optional[Dict[str, Any]] = None
     image_quality: Optional[Dict[str, Any]] = None
     processed_time: Optional[datetime] = None
-    error_message: Optional[str] = None
\ No newline at end of file
+    error_message: Optional[str] = None
+    file_hash: Optional[bytes] = None
+
+    def is_completed(self) -> bool:
+        return self.status == ScanStatus.COMPLETED
+
+    def is_processing(self) -> bool:
+        return self.status == ScanStatus.PROCESSING
+
+    def mark_as_processing(self) -> None:
+        self.status = ScanStatus.PROCESSING
+
+    def mark_as_completed(self, score: int, answers: array, total_questions: int) -> None:
+        self.status = ScanStatus.COMPLETED
+        self.score = score
+        self.answers = answers
+        self.total_questions = total_questions
+
+    def answer_at(self, index: int) -> str:
+        """Letter marked for a question, or an empty string if blank"""
+        ordinal = self.answers[index]
+        return ANSWER_CHOICES[ordinal] if 0 <= ordinal < len(ANSWER_CHOICES) else ""
+
+    def mark_as_error(self, error_message: str) -> None:
+        self.status = ScanStatus.ERROR
+        self.error_message = error_message
+
+    def to_dict(self) -> Dict[str, Any]:
+        """API representation of the scan (camelCase, as consumed by the frontend)"""
+        regions = None
+        if self.regions is not None:
+            regions = {
+                name: asdict(box) if isinstance(box, RegionBoundingBox) else box
+                for name, box in self.regions.items()
+            }
+        return {
+            'id': str(self.id),
+            'filename': self.filename,
+            'status': self.status,
+            'score': self.score,
+            'answers': decode_answers(self.answers),
+            'totalQuestions': self.total_questions,
+            'nombre': self.nombre,
+            'curp': self.curp,
+            'imageQuality': self.image_quality,
+            'regions': regions,
+            # datetimes are left to the JSON encoder (orjson emits ISO 8601 natively)
+            'uploadTime': self.upload_time,
+            'processedTime': self.processed_time,
+            'errorMessage': self.error_message
+        }
+
+# Alias used by repositories and mappers (single scan entity)
+Scan = ProcessedScan
@@ -2,9 +2,9 @@
 Repository interfaces for domain entities.
 """
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from uuid import UUID
-from .entities import Scan
+from .entities import Scan, ScanStatus
 
 class ScanRepository(ABC):
     """Interface for scan persistence operations"""
@@ -12,18 +12,66 @@ class ScanRepository(ABC):
     async def create(self, scan: Scan) -> Scan:
         ...
 
+    @abstractmethod
+    async def create_many(self, scans: List[Scan]) -> List[Scan]:
+        ...
+
     @abstractmethod
     async def get_by_id(self, scan_id: UUID) -> Optional[Scan]:
         ...
 
+    @abstractmethod
+    async def get_response_json(self, scan_id: UUID) -> Optional[str]:
+        """Prebuilt JSON payload of a processed scan, or None if it has none"""
+        ...
+
+    @abstractmethod
+    async def find_processed_by_hash(self, file_hash: bytes) -> Optional[Tuple[UUID, ScanStatus]]:
+        """Id and status of the newest successfully processed scan of an identical upload"""
+        ...
+
+    @abstractmethod
+    def iter_processed_hashes(self) -> AsyncIterator[bytes]:
+        """Stream the upload hashes of all successfully processed scans"""
+        ...
+
     @abstractmethod
     async def get_all(self) -> List[Scan]:
         ...
 
+    @abstractmethod
+    async def list_scans(self, status: Optional[str], limit: int, offset: int) -> Tuple[List[Scan], int]:
+        """Newest-first page of scans, optionally filtered by status, and the filtered total"""
+        ...
+
+    @abstractmethod
+    async def get_page(self, after_id: Optional[UUID], limit: int) -> List[Scan]:
+        """Keyset page of scans ordered by id, starting after ``after_id``"""
+        ...
+
+    @abstractmethod
+    def iter_all(self) -> AsyncIterator[Scan]:
+        """Stream every scan without materializing the full result set"""
+        ...
+
+    @abstractmethod
+    async def revalidate_batch(self, batch_size: int = 1024) -> int:
+        """Recompute review flags for all processed scans; returns the number changed"""
+        ...
+
     @abstractmethod
     async def update(self, scan: Scan) -> Scan:
         ...
 
+    @abstractmethod
+    async def update_many(self, scans: List[Scan]) -> List[Scan]:
+        ...
+
+    @abstractmethod
+    async def finalize(self, scan: Scan) -> Scan:
+        """Persist the terminal state (results or error) in one statement"""
+        ...
+
     @abstractmethod
     async def delete(self, scan_id: UUID) -> bool:
         ...
\ No newline at end of file
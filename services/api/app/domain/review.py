@@ -0,0 +1,60 @@
+"""
+Manual-review rules for OCR fields, vectorized for batch revalidation.
+"""
+import re
+from typing import Sequence, Tuple
+
+import numpy as np
+
+# OCR confidence below which a field is flagged for manual review
+NOMBRE_REVIEW_CONFIDENCE = 0.8
+CURP_REVIEW_CONFIDENCE = 0.9
+
+CURP_LENGTH = 18
+# CURP: 4 letters, birth date (YYMMDD), sex, 5 letters, 2 check characters; compiled once
+CURP_RE = re.compile(r'[A-Z]{4}[0-9]{6}[HM][A-Z]{5}[0-9]{2}')
+
+
+def is_valid_curp(value: str) -> bool:
+    """Single-value CURP format check; the length test skips the regex for most OCR misreads"""
+    return len(value) == CURP_LENGTH and CURP_RE.fullmatch(value) is not None
+
+
+def _curp_position_table() -> np.ndarray:
+    """allowed[pos, byte]: CURP is 4 letters, YYMMDD, sex (H/M), 5 letters, 2 digits"""
+    letters = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", dtype=np.uint8)
+    digits = np.frombuffer(b"0123456789", dtype=np.uint8)
+    sex = np.frombuffer(b"HM", dtype=np.uint8)
+    classes = [letters] * 4 + [digits] * 6 + [sex] + [letters] * 5 + [digits] * 2
+    allowed = np.zeros((CURP_LENGTH, 256), dtype=bool)
+    for pos, chars in enumerate(classes):
+        allowed[pos, chars] = True
+    return allowed
+
+
+_CURP_ALLOWED = _curp_position_table()
+_CURP_POSITIONS = np.arange(CURP_LENGTH)
+
+
+def curp_format_mask(values: Sequence[str]) -> np.ndarray:
+    """Boolean mask of values that are well-formed CURPs (same rule as is_valid_curp)"""
+    if not values:
+        return np.zeros(0, dtype=bool)
+    stripped = [v.strip() for v in values]
+    lengths = np.fromiter((len(v) for v in stripped), dtype=np.intp, count=len(stripped))
+    # Non-ASCII becomes '?' (rejected); 'S18' pads short values with NUL (also rejected)
+    encoded = np.array([v.encode("ascii", "replace") for v in stripped], dtype=f"S{CURP_LENGTH}")
+    chars = encoded.view(np.uint8).reshape(-1, CURP_LENGTH)
+    return (lengths == CURP_LENGTH) & _CURP_ALLOWED[_CURP_POSITIONS, chars].all(axis=1)
+
+
+def review_flags(
+    nombre_confidence: np.ndarray,
+    curp_confidence: np.ndarray,
+    curp_values: Sequence[str]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """needsReview flags for the nombre and CURP fields of a batch of scans"""
+    nombre_review = np.asarray(nombre_confidence, dtype=np.float64) < NOMBRE_REVIEW_CONFIDENCE
+    curp_review = (np.asarray(curp_confidence, dtype=np.float64) < CURP_REVIEW_CONFIDENCE) \
+        | ~curp_format_mask(curp_values)
+    return nombre_review, curp_review
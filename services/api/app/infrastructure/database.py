@@ -1,5 +1,4 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 # Declarative base and column mapping compatibility for SQLAlchemy <2.0
 try:
@@ -11,11 +10,26 @@ except ImportError:
     Mapped = None
     def mapped_column(*args, **kwargs):
         return Column(*args, **kwargs)
-from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy import DateTime, String, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY, BYTEA
+from sqlalchemy import DateTime, String, Integer, SmallInteger, ForeignKey, func
 from datetime import datetime
-from uuid import uuid4
+from uuid import UUID as PyUUID
 import os
+import time
+from typing import Any, AsyncIterator
+
+import orjson
+
+# Time-ordered primary keys: new rows land on the right edge of the B-tree
+try:
+    from uuid_utils.compat import uuid7
+except ImportError:
+    def uuid7() -> PyUUID:
+        """UUIDv7 (RFC 9562): 48-bit Unix epoch milliseconds followed by random bits"""
+        value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+        value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+        value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+        return PyUUID(int=value)
 
 
 class Base(DeclarativeBase):
@@ -25,13 +39,14 @@ class Base(DeclarativeBase):
 class ScanModel(Base):
     __tablename__ = "scans"
     
-    id: Mapped[UUID] = mapped_column(UUID, primary_key=True, default=uuid4)
+    id: Mapped[UUID] = mapped_column(UUID, primary_key=True, default=uuid7)
     filename: Mapped[str] = mapped_column(String(255))
     status: Mapped[str] = mapped_column(String(50), default="QUEUED")
     score: Mapped[int] = mapped_column(Integer, nullable=True)
-    answers: Mapped[dict] = mapped_column(JSONB, nullable=True)
+    # Answers as ordinals (0=A, 1=B, ..., -1 blank); letters are decoded on read
+    answers_ord: Mapped[list] = mapped_column(ARRAY(SmallInteger), nullable=True)
     total_questions: Mapped[int] = mapped_column(Integer, nullable=True)
-    upload_time: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    upload_time: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     processed_time: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     error_message: Mapped[str] = mapped_column(String(500), nullable=True)
     # Enriched processing fields
@@ -43,34 +58,62 @@ class ScanModel(Base):
     curp_value: Mapped[str] = mapped_column(String(18), nullable=True)
     exam_id: Mapped[UUID] = mapped_column(UUID, ForeignKey("exam_templates.id"), nullable=True)
     image_quality: Mapped[dict] = mapped_column(JSONB, nullable=True)
+    # Raw 32-byte digest of the uploaded file, for duplicate detection
+    file_hash: Mapped[bytes] = mapped_column(BYTEA, nullable=True)
+    # to_dict() snapshot written with the processed results, served as-is by GET /scans/{id}
+    response_json: Mapped[dict] = mapped_column(JSONB, nullable=True)
     
 # Alias for processed scans table to match orchestrator domain
 ProcessedScanModel = ScanModel
 
 class TemplateModel(Base):
     __tablename__ = "exam_templates"
-    id: Mapped[UUID] = mapped_column(UUID, primary_key=True, default=uuid4)
+    id: Mapped[UUID] = mapped_column(UUID, primary_key=True, default=uuid7)
     name: Mapped[str] = mapped_column(String(255))
     description: Mapped[str] = mapped_column(String(1000))
     total_questions: Mapped[int] = mapped_column(Integer)
     correct_answers: Mapped[list] = mapped_column(JSONB)
 
 
+def _json_serializer(value: Any) -> str:
+    # orjson for JSONB binds: faster than json.dumps and encodes datetimes and UUIDs natively
+    return orjson.dumps(value).decode()
+
+
 class DatabaseConfig:
     def __init__(self):
         self.database_url = os.getenv("DATABASE_URL", "postgresql+asyncpg://omr:omr@db/omr")
-        self.engine = create_async_engine(self.database_url, echo=True)
-        self.async_session = sessionmaker(
-            bind=self.engine, class_=AsyncSession, expire_on_commit=False
+        self.engine = create_async_engine(
+            self.database_url,
+            # SQL logging formats every statement; opt in for local debugging only
+            echo=os.getenv("SQL_ECHO", "").lower() in ("1", "true"),
+            echo_pool=False,
+            # Sized for concurrent uploads plus background processing tasks; tune per worker count
+            pool_size=int(os.getenv("DB_POOL_SIZE", "25")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "25")),
+            pool_pre_ping=True,
+            pool_recycle=300,
+            # Compiled-SQL LRU; sized so the fixed lifecycle UPDATEs never get evicted
+            query_cache_size=1200,
+            json_serializer=_json_serializer,
+            connect_args={
+                # Short OLTP queries never benefit from PG JIT compilation
+                "server_settings": {"jit": "off", "application_name": "bubblegrade-api"},
+                # asyncpg's own statement cache and SQLAlchemy's per-connection prepared statements
+                "statement_cache_size": 2048,
+                "prepared_statement_cache_size": 2048
+            }
         )
+        self.async_session = async_sessionmaker(self.engine, expire_on_commit=False)
 
-    async def get_session(self) -> AsyncSession:
-        async with self.async_session() as session:
+    async def get_session(self) -> AsyncIterator[AsyncSession]:
+        """One session per request: commits once on success, rolls back on error"""
+        async with self.async_session.begin() as session:
             yield session
 
     async def close(self):
         await self.engine.dispose()
 
 
-# Global database configuration
+# Global database configuration (single engine/pool shared by the whole API)
 db_config = DatabaseConfig()
\ No newline at end of file
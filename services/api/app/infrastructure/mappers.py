@@ -1,32 +1,69 @@
-from ..domain.entities import Scan, ScanStatus
+from array import array
+from dataclasses import asdict
+from typing import Any, Dict, Optional
+
+from ..domain.entities import RegionBoundingBox, Scan, ScanStatus
 from .database import ScanModel
 
 
+def answers_ord_column(answers: Optional[array]) -> Optional[list]:
+    """SMALLINT[] bind value for the in-memory answer array"""
+    return answers.tolist() if answers is not None else None
+
+
+def regions_column(regions: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """JSONB bind value for detected regions, which are held in memory as bounding boxes"""
+    if regions is None:
+        return None
+    return {
+        name: asdict(box) if isinstance(box, RegionBoundingBox) else box
+        for name, box in regions.items()
+    }
+
+
+def response_json_column(entity: Scan) -> Optional[Dict[str, Any]]:
+    """API representation to materialize; only processed scans are served from the snapshot"""
+    if entity.status in (ScanStatus.COMPLETED, ScanStatus.NEEDS_REVIEW):
+        return entity.to_dict()
+    return None
+
+
 class ScanMapper:
     @staticmethod
     def to_entity(model: ScanModel) -> Scan:
         """Convert SQLAlchemy model to domain entity"""
-        entity = Scan(
+        return Scan(
             id=model.id,
             filename=model.filename,
             status=ScanStatus(model.status),
             upload_time=model.upload_time,
             score=model.score,
-            answers=model.answers,
+            answers=array('b', model.answers_ord) if model.answers_ord is not None else None,
             total_questions=model.total_questions,
             processed_time=model.processed_time,
-            error_message=model.error_message
+            error_message=model.error_message,
+            regions=model.regions,
+            nombre=model.nombre,
+            curp=model.curp,
+            image_quality=model.image_quality,
+            file_hash=model.file_hash
+        )
+
+    @staticmethod
+    def listing_to_entity(row) -> Scan:
+        """Convert a projected listing row (no answers, regions or quality data) to a domain entity"""
+        return Scan(
+            id=row.id,
+            filename=row.filename,
+            status=ScanStatus(row.status),
+            upload_time=row.upload_time,
+            score=row.score,
+            total_questions=row.total_questions,
+            processed_time=row.processed_time,
+            error_message=row.error_message,
+            nombre=row.nombre,
+            curp=row.curp
         )
-        # Attach enriched fields if available
-        if hasattr(model, 'regions'):
-            setattr(entity, 'regions', model.regions)
-        if hasattr(model, 'nombre'):
-            setattr(entity, 'nombre', model.nombre)
-        if hasattr(model, 'curp'):
-            setattr(entity, 'curp', model.curp)
-        if hasattr(model, 'image_quality'):
-            setattr(entity, 'image_quality', model.image_quality)
-        return entity
 
     @staticmethod
     def to_model(entity: Scan) -> ScanModel:
@@ -34,21 +71,44 @@ class ScanMapper:
         model = ScanModel(
             id=entity.id,
             filename=entity.filename,
-            status=entity.status.value,
+            status=entity.status,
             score=entity.score,
-            answers=entity.answers,
+            answers_ord=answers_ord_column(entity.answers),
             total_questions=entity.total_questions,
-            upload_time=entity.upload_time,
             processed_time=entity.processed_time,
-            error_message=entity.error_message
+            error_message=entity.error_message,
+            regions=regions_column(entity.regions),
+            nombre=entity.nombre,
+            curp=entity.curp,
+            image_quality=entity.image_quality,
+            file_hash=entity.file_hash,
+            response_json=response_json_column(entity)
         )
-        # Map enriched fields if present on entity
-        if getattr(entity, 'regions', None) is not None:
-            model.regions = entity.regions  # type: ignore
-        if getattr(entity, 'nombre', None) is not None:
-            model.nombre = entity.nombre  # type: ignore
-        if getattr(entity, 'curp', None) is not None:
-            model.curp = entity.curp  # type: ignore
-        if getattr(entity, 'image_quality', None) is not None:
-            model.image_quality = entity.image_quality  # type: ignore
-        return model
\ No newline at end of file
+        # Leave upload_time unset so the server default applies
+        if entity.upload_time is not None:
+            model.upload_time = entity.upload_time
+        return model
+
+    @staticmethod
+    def to_row(entity: Scan) -> dict:
+        """Convert domain entity to a plain column dict for bulk statements"""
+        row = {
+            'id': entity.id,
+            'filename': entity.filename,
+            'status': entity.status,
+            'score': entity.score,
+            'answers_ord': answers_ord_column(entity.answers),
+            'total_questions': entity.total_questions,
+            'upload_time': entity.upload_time,
+            'processed_time': entity.processed_time,
+            'error_message': entity.error_message,
+            'regions': regions_column(entity.regions),
+            'nombre': entity.nombre,
+            'curp': entity.curp,
+            'image_quality': entity.image_quality,
+            'file_hash': entity.file_hash,
+            'response_json': response_json_column(entity)
+        }
+        if row['upload_time'] is None:
+            del row['upload_time']
+        return row
\ No newline at end of file
@@ -1,25 +1,102 @@
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, insert, delete, func, bindparam, cast, literal_column, Text
 from sqlalchemy.orm import selectinload
 
 from ..domain.entities import Scan, ScanStatus
 from ..domain.repositories import ScanRepository
+from ..domain.review import review_flags
 from .database import ScanModel
 from .mappers import ScanMapper
 
+# Rows per executemany round-trip for bulk inserts/updates
+BULK_CHUNK_SIZE = 500
+
+# Columns needed to render the scans table
+_LISTING_COLUMNS = (
+    ScanModel.id, ScanModel.filename, ScanModel.status, ScanModel.score,
+    ScanModel.total_questions, ScanModel.upload_time, ScanModel.processed_time,
+    ScanModel.error_message, ScanModel.nombre, ScanModel.curp
+)
+
+# Terminal states whose results a re-upload of the same file would reproduce
+_PROCESSED_STATUSES = (ScanStatus.COMPLETED, ScanStatus.NEEDS_REVIEW)
+
+# Columns written by each lifecycle transition
+_ERROR_COLUMNS = ('status', 'error_message', 'response_json')
+_RESULT_COLUMNS = (
+    'status', 'score', 'answers_ord', 'total_questions', 'processed_time',
+    'error_message', 'regions', 'nombre', 'curp', 'image_quality', 'response_json'
+)
+_UPDATE_COLUMNS: Dict[ScanStatus, Tuple[str, ...]] = {
+    ScanStatus.ERROR: _ERROR_COLUMNS,
+}
+
+
+def _update_statement(columns: Tuple[str, ...], **values):
+    """UPDATE scans SET <columns> WHERE id = :scan_id, built once and reused for every call"""
+    return (
+        update(ScanModel)
+        .where(ScanModel.id == bindparam('scan_id'))
+        .values({**{column: bindparam(f'new_{column}') for column in columns}, **values})
+        # Plain Core UPDATE: no identity-map synchronization per call
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _update_params(scan: Scan, columns: Tuple[str, ...]) -> dict:
+    row = ScanMapper.to_row(scan)
+    params = {f'new_{column}': row.get(column) for column in columns}
+    params['scan_id'] = scan.id
+    return params
+
+
+_UPDATE_STATEMENTS = {columns: _update_statement(columns) for columns in {*_UPDATE_COLUMNS.values(), _RESULT_COLUMNS}}
+_FINAL_COLUMNS = tuple(column for column in _RESULT_COLUMNS if column != 'processed_time')
+_FINALIZE_STATEMENT = _update_statement(_FINAL_COLUMNS, processed_time=func.now()).returning(ScanModel.processed_time)
+
+# Materialized API payload as JSON text; processed_time is stamped by the DB in the same
+# write that stores the snapshot, so it is spliced in here rather than stored stale
+_RESPONSE_JSON_STATEMENT = select(
+    cast(
+        func.jsonb_set(
+            ScanModel.response_json,
+            literal_column("'{processedTime}'"),
+            func.coalesce(func.to_jsonb(ScanModel.processed_time), literal_column("'null'::jsonb"))
+        ),
+        Text
+    )
+).where(ScanModel.id == bindparam('scan_id'))
+
 
 class SQLAlchemyScanRepository(ScanRepository):
+    """
+    Scan persistence on a caller-owned session. Statements execute immediately;
+    the surrounding transaction (request scope or scan_repository_scope) commits.
+    """
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def create(self, scan: Scan) -> Scan:
-        scan_model = ScanMapper.to_model(scan)
-        self.session.add(scan_model)
-        await self.session.commit()
-        await self.session.refresh(scan_model)
-        return ScanMapper.to_entity(scan_model)
+        # INSERT ... RETURNING brings server defaults back without a refresh round-trip
+        result = await self.session.execute(
+            insert(ScanModel).values(ScanMapper.to_row(scan)).returning(ScanModel)
+        )
+        created = ScanMapper.to_entity(result.scalar_one())
+        return created
+
+    async def create_many(self, scans: List[Scan]) -> List[Scan]:
+        # One batched INSERT ... RETURNING per chunk instead of one INSERT per scan
+        created: List[Scan] = []
+        for start in range(0, len(scans), BULK_CHUNK_SIZE):
+            chunk = scans[start:start + BULK_CHUNK_SIZE]
+            result = await self.session.execute(
+                insert(ScanModel).returning(ScanModel, sort_by_parameter_order=True),
+                [ScanMapper.to_row(scan) for scan in chunk]
+            )
+            created.extend(ScanMapper.to_entity(model) for model in result.scalars())
+        return created
 
     async def get_by_id(self, scan_id: UUID) -> Optional[Scan]:
         result = await self.session.execute(
@@ -28,44 +105,135 @@ class SQLAlchemyScanRepository(ScanRepository):
         scan_model = result.scalar_one_or_none()
         return ScanMapper.to_entity(scan_model) if scan_model else None
 
+    async def get_response_json(self, scan_id: UUID) -> Optional[str]:
+        return await self.session.scalar(_RESPONSE_JSON_STATEMENT, {'scan_id': scan_id})
+
+    async def find_processed_by_hash(self, file_hash: bytes) -> Optional[Tuple[UUID, ScanStatus]]:
+        result = await self.session.execute(
+            select(ScanModel.id, ScanModel.status)
+            .where(ScanModel.file_hash == file_hash, ScanModel.status.in_(_PROCESSED_STATUSES))
+            .order_by(ScanModel.upload_time.desc())
+            .limit(1)
+        )
+        row = result.first()
+        return (row.id, ScanStatus(row.status)) if row else None
+
+    async def iter_processed_hashes(self) -> AsyncIterator[bytes]:
+        result = await self.session.stream_scalars(
+            select(ScanModel.file_hash)
+            .where(ScanModel.file_hash.is_not(None), ScanModel.status.in_(_PROCESSED_STATUSES))
+        )
+        async for file_hash in result:
+            yield file_hash
+
     async def get_all(self) -> List[Scan]:
+        # Listing projection: skips the answers_ord array and the regions/image_quality JSONB payloads
         result = await self.session.execute(
-            select(ScanModel).order_by(ScanModel.upload_time.desc())
+            select(*_LISTING_COLUMNS).order_by(ScanModel.upload_time.desc())
         )
-        scan_models = result.scalars().all()
-        return [ScanMapper.to_entity(model) for model in scan_models]
+        return [ScanMapper.listing_to_entity(row) for row in result]
 
-    async def update(self, scan: Scan) -> Scan:
-        # Update basic and enriched fields
-        await self.session.execute(
-            update(ScanModel)
-            .where(ScanModel.id == scan.id)
-            .values(
-                status=scan.status.value,
-                score=scan.score,
-                answers=scan.answers,
-                total_questions=scan.total_questions,
-                processed_time=scan.processed_time,
-                error_message=scan.error_message,
-                regions=getattr(scan, 'regions', None),
-                nombre=getattr(scan, 'nombre', None),
-                curp=getattr(scan, 'curp', None),
-                image_quality=getattr(scan, 'image_quality', None)
-            )
+    async def list_scans(self, status: Optional[str], limit: int, offset: int) -> Tuple[List[Scan], int]:
+        # Filter and paginate in SQL so only one page of rows leaves the database
+        page = select(*_LISTING_COLUMNS).order_by(ScanModel.upload_time.desc()).limit(limit).offset(offset)
+        count = select(func.count()).select_from(ScanModel)
+        if status:
+            page = page.where(ScanModel.status == status)
+            count = count.where(ScanModel.status == status)
+        result = await self.session.execute(page)
+        scans = [ScanMapper.listing_to_entity(row) for row in result]
+        total = await self.session.scalar(count)
+        return scans, total
+
+    async def get_page(self, after_id: Optional[UUID], limit: int) -> List[Scan]:
+        stmt = select(ScanModel).order_by(ScanModel.id).limit(limit)
+        if after_id is not None:
+            stmt = stmt.where(ScanModel.id > after_id)
+        result = await self.session.execute(stmt)
+        return [ScanMapper.to_entity(model) for model in result.scalars()]
+
+    async def iter_all(self) -> AsyncIterator[Scan]:
+        # Server-side cursor: rows are fetched in batches as the caller consumes them
+        result = await self.session.stream_scalars(
+            select(ScanModel).order_by(ScanModel.id)
         )
-        await self.session.commit()
+        async for model in result:
+            yield ScanMapper.to_entity(model)
+
+    async def revalidate_batch(self, batch_size: int = 1024) -> int:
+        """
+        Recompute the OCR review flags and review status of every processed scan,
+        a keyset page at a time; manually corrected fields are left as they are.
+        Returns the number of scans changed.
+        """
+        changed = 0
+        after_id = None
+        while True:
+            stmt = (
+                select(ScanModel.id, ScanModel.status, ScanModel.score, ScanModel.nombre, ScanModel.curp)
+                .where(ScanModel.status.in_(_PROCESSED_STATUSES))
+                .order_by(ScanModel.id)
+                .limit(batch_size)
+            )
+            if after_id is not None:
+                stmt = stmt.where(ScanModel.id > after_id)
+            rows = (await self.session.execute(stmt)).all()
+            if not rows:
+                return changed
+            after_id = rows[-1].id
+
+            nombres = [row.nombre or {} for row in rows]
+            curps = [row.curp or {} for row in rows]
+            nombre_review, curp_review = review_flags(
+                [n.get('confidence') or 0.0 for n in nombres],
+                [c.get('confidence') or 0.0 for c in curps],
+                [c.get('value') or '' for c in curps]
+            )
+            updates = []
+            for i, row in enumerate(rows):
+                nombre, curp = nombres[i], curps[i]
+                new_nombre = nombre if nombre.get('correctedBy') else {**nombre, 'needsReview': bool(nombre_review[i])}
+                new_curp = curp if curp.get('correctedBy') else {**curp, 'needsReview': bool(curp_review[i])}
+                needs_review = new_nombre.get('needsReview') or new_curp.get('needsReview') or row.score == 0
+                status = ScanStatus.NEEDS_REVIEW if needs_review else ScanStatus.COMPLETED
+                if new_nombre != nombre or new_curp != curp or status != row.status:
+                    # The stale response snapshot is dropped; get_scan falls back to rendering the entity
+                    updates.append({
+                        'id': row.id, 'nombre': new_nombre, 'curp': new_curp, 'status': status,
+                        'response_json': None
+                    })
+            if updates:
+                await self.session.execute(update(ScanModel), updates)
+                changed += len(updates)
+
+    async def update(self, scan: Scan) -> Scan:
+        # Prebuilt statement for the scan's lifecycle state; only that state's columns are written
+        columns = _UPDATE_COLUMNS.get(scan.status, _RESULT_COLUMNS)
+        await self.session.execute(_UPDATE_STATEMENTS[columns], _update_params(scan, columns))
+        return scan
+
+    async def update_many(self, scans: List[Scan]) -> List[Scan]:
+        # ORM bulk UPDATE by primary key; upload_time is immutable after insert
+        for start in range(0, len(scans), BULK_CHUNK_SIZE):
+            chunk = scans[start:start + BULK_CHUNK_SIZE]
+            rows = [ScanMapper.to_row(scan) for scan in chunk]
+            for row in rows:
+                row.pop('upload_time', None)
+            await self.session.execute(update(ScanModel), rows)
+        return scans
+
+    async def finalize(self, scan: Scan) -> Scan:
+        # Single terminal write: results/error and processed_time stamped by the DB
+        result = await self.session.execute(_FINALIZE_STATEMENT, _update_params(scan, _FINAL_COLUMNS))
+        scan.processed_time = result.scalar_one_or_none()
         return scan
 
     async def delete(self, scan_id: UUID) -> bool:
+        # Single DELETE; rowcount tells whether the scan existed
         result = await self.session.execute(
-            select(ScanModel).where(ScanModel.id == scan_id)
+            delete(ScanModel).where(ScanModel.id == scan_id)
         )
-        scan_model = result.scalar_one_or_none()
-        if scan_model:
-            await self.session.delete(scan_model)
-            await self.session.commit()
-            return True
-        return False
+        return result.rowcount > 0
     
 # Alias for v2 orchestrator
 ProcessedScanRepository = SQLAlchemyScanRepository
\ No newline at end of file
@@ -8,33 +8,102 @@ import cv2
 import numpy as np
 import httpx
 import aiofiles
-from fastapi import FastAPI, UploadFile, HTTPException, BackgroundTasks, Depends, Form, Request, Response
+from fastapi import FastAPI, UploadFile, HTTPException, BackgroundTasks, Depends, Form, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from typing import Optional, Dict, Any, List
-from pydantic import BaseModel
+from typing import Optional, Dict, Any, List, AsyncIterator
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, field_validator
+import importlib.util
 import json
+import orjson
 import os
 import sys
+import tempfile
 from loguru import logger
 from prometheus_client import Counter, generate_latest, CONTENT_TYPE_LATEST
-from uuid import uuid4
 
-from .domain.entities import ProcessedScan, ScanStatus, RegionBoundingBox
-from .infrastructure.database import ProcessedScanModel
+from .domain.entities import ANSWER_CHOICES, ProcessedScan, ScanStatus, RegionBoundingBox, encode_answers
+from .domain.review import NOMBRE_REVIEW_CONFIDENCE, CURP_REVIEW_CONFIDENCE, is_valid_curp
+from .infrastructure.database import ProcessedScanModel, db_config, uuid7
 from .infrastructure.repositories import ProcessedScanRepository
 from .services.image_processing import ImageProcessor
 from .services.microservice_client import MicroserviceClient
+from .services.file_validator import FileValidator, HEADER_BYTES
+from .services.jpeg_codec import encode_jpeg, read_image
+from .services.rate_limiter import create_rate_limiter
+from .services.cache import create_cache
+from .services.bloom_filter import BloomFilter, BloomFilterRelay
+from .services.grading_pool import GradingPool
 from .services.ws_manager import manager
+from .responses import OrjsonResponse
+from .services.excel_export import OpenpyxlExcelExportService, XLSX_MEDIA_TYPE, get_answer_key
 
 # Configure structured logging
 logger.remove()
 logger.add(sys.stdout, level=os.getenv("LOG_LEVEL", "INFO"), enqueue=True, backtrace=True, diagnose=True)
 
-app = FastAPI(title="BubbleGrade API", version="2.0.0")
+# Pool for the OMR/OCR microservice calls, shared by every scan for the process lifetime
+MICROSERVICE_TIMEOUT = 60.0
+MICROSERVICE_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=50)
+# HTTP/2 multiplexes concurrent OMR/OCR calls over one connection. Opt-in: it needs the h2
+# package and https:// microservice URLs behind an HTTP/2 proxy (uvicorn speaks HTTP/1.1 only)
+MICROSERVICE_HTTP2 = (
+    os.getenv("MICROSERVICE_HTTP2", "").lower() in ("1", "true")
+    and importlib.util.find_spec("h2") is not None
+)
+
+async def preload_tesseract():
+    """Preload Tesseract for performance"""
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        logger.info("Tesseract preloaded successfully")
+    except Exception as e:
+        logger.error(f"Error preloading Tesseract: {e}")
+
+def check_xlsx_serializer():
+    # openpyxl silently falls back to the pure-Python ElementTree writer without lxml
+    from openpyxl.xml import LXML
+    if not LXML:
+        logger.warning("lxml is not installed; xlsx exports will use the slower pure-Python XML writer")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await preload_tesseract()
+    check_xlsx_serializer()
+    grading_pool.start()
+    try:
+        # Worker spawn and OpenCV initialization are paid here, not by the first scan
+        try:
+            await grading_pool.warm_up()
+            logger.info(f"Grading pool warmed up ({grading_pool.max_workers} workers)")
+        except Exception as e:
+            logger.error(f"Error warming up grading pool: {e}")
+        await dedup_filter_relay.start(os.getenv("REDIS_URL", ""))
+        await manager.start_relay(os.getenv("REDIS_URL", ""))
+        # One AsyncClient owned by the app: keep-alive connections are reused across
+        # scans and closed exactly once on shutdown
+        async with httpx.AsyncClient(
+            timeout=MICROSERVICE_TIMEOUT, limits=MICROSERVICE_LIMITS, http2=MICROSERVICE_HTTP2
+        ) as http:
+            app.state.http = http
+            microservice_client.bind(http)
+            yield
+    finally:
+        await grading_pool.aclose()
+        await manager.flush()
+        await manager.stop_relay()
+        await dedup_filter_relay.aclose()
+        await upload_rate_limiter.aclose()
+        await response_cache.aclose()
+        await microservice_client.aclose()
+
+app = FastAPI(title="BubbleGrade API", version="2.0.0", lifespan=lifespan, default_response_class=OrjsonResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -44,16 +113,6 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
-  
-# Startup event: preload Tesseract for performance
-@app.on_event("startup")
-async def preload_tesseract():
-    try:
-        import pytesseract
-        pytesseract.get_tesseract_version()
-        logger.info("Tesseract preloaded successfully")
-    except Exception as e:
-        logger.error(f"Error preloading Tesseract: {e}")
 
 # Prometheus metrics
 REQUEST_COUNT = Counter("http_requests_total", "Total HTTP Requests", ["method", "endpoint", "http_status"])
@@ -70,28 +129,122 @@ app.include_router(metrics_router)
 from .routers.ws import router as ws_router
 app.include_router(ws_router)
 
-# Database configuration
-DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://omr:omr@db/omr")
-engine = create_async_engine(DATABASE_URL, echo=True)
-async_session = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+# Database configuration (shared with infrastructure.database)
+engine = db_config.engine
+async_session = db_config.async_session
 
 # Service URLs
 OMR_SERVICE_URL = os.getenv("OMR_URL", "http://omr:8090")
 OCR_SERVICE_URL = os.getenv("OCR_URL", "http://ocr:8100")
 
+# Uploads are spooled to disk in fixed-size chunks before background processing
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", tempfile.gettempdir())
+UPLOAD_CHUNK_SIZE = 1 << 20
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # 10MB limit
+# Allowance for multipart boundaries, part headers and form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Uploads accepted per client per minute
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+
+# Scans processed at once; further uploads wait (QUEUED) instead of oversubscribing CPU and the DB pool
+MAX_CONCURRENT_SCANS = int(os.getenv("MAX_CONCURRENT_SCANS", "4"))
+
+# Grade through the OMR/OCR microservices (concurrently) instead of the local module
+PARALLEL_MICROSERVICES = os.getenv("PARALLEL_MICROSERVICES", "").lower() in ("1", "true")
+
+# Grading worker processes; more than MAX_CONCURRENT_SCANS would sit idle
+GRADING_WORKERS = int(os.getenv("GRADING_WORKERS", str(min(os.cpu_count() or 1, MAX_CONCURRENT_SCANS))))
+
+# Processed uploads the duplicate filter is sized for (~1.8 MB per million at 0.1% false positives)
+DEDUP_FILTER_CAPACITY = int(os.getenv("DEDUP_FILTER_CAPACITY", "1000000"))
+
 # Initialize services
 image_processor = ImageProcessor()
+file_validator = FileValidator()
+upload_rate_limiter = create_rate_limiter(RATE_LIMIT_PER_MINUTE, os.getenv("REDIS_URL", ""))
+response_cache = create_cache(os.getenv("REDIS_URL", ""))
+grading_pool = GradingPool(GRADING_WORKERS)
+dedup_filter = BloomFilter(DEDUP_FILTER_CAPACITY)
+# The HTTP client is bound in lifespan
 microservice_client = MicroserviceClient(
     omr_url=OMR_SERVICE_URL,
-    ocr_url=OCR_SERVICE_URL,
-    timeout=60.0
+    ocr_url=OCR_SERVICE_URL
 )
 
-async def get_scan_repository() -> ProcessedScanRepository:
-    """Dependency injection for scan repository"""
-    return ProcessedScanRepository(async_session)
+async def limit_upload_rate(request: Request) -> None:
+    """Reject clients exceeding RATE_LIMIT_PER_MINUTE uploads with 429"""
+    client_id = request.client.host if request.client else "unknown"
+    allowed, retry_after = await upload_rate_limiter.check(client_id, "upload")
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many uploads. Please retry later.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+async def get_scan_repository(
+    session: AsyncSession = Depends(db_config.get_session)
+) -> ProcessedScanRepository:
+    """Dependency injection for scan repository bound to the request's transaction"""
+    return ProcessedScanRepository(session)
+
+async def get_committed_scan_repository(
+    # Function scope: the transaction commits when the handler returns, before the response
+    # is sent and before its background tasks run, so those only follow stored writes
+    session: AsyncSession = Depends(db_config.get_session, scope="function")
+) -> ProcessedScanRepository:
+    """Dependency injection for a scan repository whose writes commit before the response"""
+    return ProcessedScanRepository(session)
+
+@asynccontextmanager
+async def scan_repository_scope() -> AsyncIterator[ProcessedScanRepository]:
+    """Repository in its own short transaction, for work outside a request (background tasks)"""
+    async with async_session.begin() as session:
+        yield ProcessedScanRepository(session)
+
+# Processed scans never change file_hash; the cached status is refreshed on manual corrections
+DEDUP_CACHE_TTL = 3600
+
+def _dedup_cache_key(file_hash: bytes) -> str:
+    return f"scan-hash:{file_hash.hex()}"
+
+async def load_dedup_filter() -> None:
+    """Add the hashes of every processed scan in the database to the duplicate filter"""
+    count = 0
+    async with scan_repository_scope() as repository:
+        async for file_hash in repository.iter_processed_hashes():
+            dedup_filter.add(file_hash)
+            count += 1
+    logger.info(f"Duplicate filter loaded with {count} processed uploads")
+
+# Shares filter additions between API workers; the filter is only trusted while it runs
+dedup_filter_relay = BloomFilterRelay(dedup_filter, load_dedup_filter)
+
+async def remember_processed_scan(file_hash: bytes, scan_id, status: ScanStatus) -> None:
+    """Cache a processed scan under its upload hash for duplicate detection"""
+    await dedup_filter_relay.publish(file_hash)
+    await response_cache.set(
+        _dedup_cache_key(file_hash),
+        orjson.dumps({"id": str(scan_id), "status": status}),
+        DEDUP_CACHE_TTL
+    )
+
+async def find_processed_scan(file_hash: bytes) -> Optional[tuple[str, ScanStatus]]:
+    """Id and status of a processed scan of the same file: cache first, then the database"""
+    cached = await response_cache.get(_dedup_cache_key(file_hash))
+    if cached is not None:
+        entry = orjson.loads(cached)
+        return entry["id"], ScanStatus(entry["status"])
+    # A new file (the common case) is answered without a database round trip, but only
+    # while the filter is known to hold every worker's additions (otherwise it is not ready)
+    if file_hash not in dedup_filter:
+        return None
+    async with scan_repository_scope() as repository:
+        existing = await repository.find_processed_by_hash(file_hash)
+    if existing is None:
+        return None
+    await remember_processed_scan(file_hash, *existing)
+    return str(existing[0]), existing[1]
 
 class DocumentOrchestrator:
     """Orchestrates the complete document processing pipeline"""
@@ -99,14 +252,31 @@ class DocumentOrchestrator:
     def __init__(self):
         self.omr_client = microservice_client
         self.image_processor = image_processor
+        self._slots = asyncio.Semaphore(MAX_CONCURRENT_SCANS)
 
-    async def process_document(
+    async def queue_scan(
         self,
         scan_id: str,
-        file_content: bytes,
         filename: str,
-        scan_repository: ProcessedScanRepository
+        file_hash: Optional[bytes] = None
     ) -> ProcessedScan:
+        """Insert the scan as QUEUED, so it is listed and fetchable while it waits for a slot"""
+        return await self._create_scan(ProcessedScan(
+            id=scan_id,
+            filename=filename,
+            status=ScanStatus.QUEUED,
+            file_hash=file_hash
+        ))
+
+    async def process_document(self, scan: ProcessedScan, file_path: str) -> ProcessedScan:
+        """
+        Run the pipeline for a queued scan once a processing slot is free. The row stays
+        QUEUED until the terminal write; PROCESSING only reaches clients over the WebSocket
+        """
+        async with self._slots:
+            return await self._process_document(scan, file_path)
+
+    async def _process_document(self, scan: ProcessedScan, file_path: str) -> ProcessedScan:
         """
         Complete document processing pipeline:
         1. Image preprocessing and quality analysis
@@ -114,103 +284,146 @@ class DocumentOrchestrator:
         3. Parallel OMR and OCR processing
         4. Results validation and storage
         """
-        # scan_id provided by caller
+        scan_id = str(scan.id)
+        filename = scan.filename
         
         try:
-            # Create initial scan record
-            scan = ProcessedScan(
-                id=scan_id,
-                filename=filename,
-                status=ScanStatus.PROCESSING,
-                upload_time=datetime.utcnow()
-            )
-            await scan_repository.create(scan)
-            # Broadcast initial status
+            # In memory and on the WebSocket only; the row is written once, by the terminal write
+            scan.mark_as_processing()
             await manager.broadcast({
                 "type": "scan_progress",
                 "scan_id": scan_id,
-                "status": scan.status.value
-            })
+                "status": scan.status
+            }, coalesce_key=scan_id, replaceable=False)
 
-            # Step 1: Preprocess image and detect regions
-            # Step 1: Preprocess image and detect regions
+        # Step 1: Preprocess image and detect regions
             logger.info(f"Starting image preprocessing for scan {scan_id}")
-            await manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "stage": "preprocessing"})
-            processed_image, regions = await self._preprocess_and_detect_regions(file_content)
+            await manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "stage": "preprocessing"}, coalesce_key=scan_id)
+            processed_image, processed_gray, regions = await self._preprocess_and_detect_regions(file_path)
             
-            # Update scan with detected regions
+            # Regions are kept in memory and persisted by the terminal write;
+            # in-progress state reaches the UI over the WebSocket only
             scan.regions = regions
-            await scan_repository.update(scan)
-
-            # Step 2: Extract region images (for optional use)
-            # region_images = await self._extract_region_images(processed_image, regions)
-
-            # Step 2: Regions detected
-            await manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "stage": "regions_detected", "region_count": len(regions)})
-            # Step 3: Unified OMR + OCR processing via local module
-            from .services.omr_ocr import grade_scan
-            logger.info(f"Starting unified OMR/OCR processing for scan {scan_id}")
-            await manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "stage": "grading"})
-            merged_result = await asyncio.get_running_loop().run_in_executor(
-                None, grade_scan, processed_image, regions
-            )
-
-            merged = merged_result
-            omr_result = {
-                'score': merged_result.get('score', 0),
-                'answers': merged_result.get('answers', []),
-                'total': merged_result.get('total', 0)
-            }
-            nombre_result = {
-                'text': merged_result.get('nombre_text', '').strip(),
-                'confidence': merged_result.get('nombre_confidence', 0.0)
-            }
-            curp_result = {
-                'text': merged_result.get('curp_text', '').strip(),
-                'confidence': merged_result.get('curp_confidence', 0.0)
-            }
-
-            # Broadcast grading results
-            await manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "stage": "graded", "score": omr_result['score'], "total": omr_result['total']})
-            # Step 4: Validate and update scan results
+            await manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "stage": "regions_detected", "region_count": len(regions)}, coalesce_key=scan_id)
+
+            # Step 2/3: OMR + OCR, either in-process or on the microservices
+            await manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "stage": "grading"}, coalesce_key=scan_id)
+            if PARALLEL_MICROSERVICES:
+                logger.info(f"Starting parallel OMR/OCR microservice calls for scan {scan_id}")
+                omr_result, nombre_result, curp_result = await self._grade_with_microservices(
+                    file_path, filename, processed_image, regions
+                )
+            else:
+                logger.info(f"Starting unified OMR/OCR processing for scan {scan_id}")
+                omr_result, nombre_result, curp_result = await self._grade_locally(processed_gray, regions)
+
+            # Progress tick with the grading results, then validate and store them (Step 4)
+            await manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "stage": "graded", "score": omr_result['score'], "total": omr_result['total']}, coalesce_key=scan_id)
             scan = await self._finalize_scan_results(
-                scan, omr_result, nombre_result, curp_result, scan_repository
+                scan, omr_result, nombre_result, curp_result
             )
 
-            await manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "status": scan.status.value, "score": scan.score})
+            await manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "status": scan.status, "score": scan.score}, coalesce_key=scan_id, replaceable=False)
             logger.info(f"Document processing completed for scan {scan_id}")
             return scan
 
         except Exception as e:
-            # Broadcast error
-            await manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "status": "ERROR", "error": str(e)})
             logger.error(f"Document processing failed for scan {scan_id}: {e}")
-            # Update scan status to error
+            # Broadcast error and persist terminal error state concurrently
             scan.status = ScanStatus.ERROR
             scan.error_message = str(e)
-            await scan_repository.update(scan)
+            await asyncio.gather(
+                self._finalize_scan(scan),
+                manager.broadcast({"type": "scan_progress", "scan_id": scan_id, "status": "ERROR", "error": str(e)}, coalesce_key=scan_id, replaceable=False)
+            )
             raise
+        finally:
+            # The spooled upload is only needed for the duration of processing
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+
+    async def _grade_locally(
+        self,
+        processed_gray: np.ndarray,
+        regions: Dict[str, RegionBoundingBox]
+    ) -> tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+        """
+        Unified OMR + OCR via the local grading module. Grading only reads grayscale,
+        so the single-channel image is what gets copied to the worker.
+        """
+        merged_result = await grading_pool.grade(processed_gray, regions)
+        omr_result = {
+            'score': merged_result.get('score', 0),
+            'answers': merged_result.get('answers', []),
+            'total': merged_result.get('total', 0)
+        }
+        nombre_result = {
+            'text': merged_result.get('nombre_text', '').strip(),
+            'confidence': merged_result.get('nombre_confidence', 0.0)
+        }
+        curp_result = {
+            'text': merged_result.get('curp_text', '').strip(),
+            'confidence': merged_result.get('curp_confidence', 0.0)
+        }
+        return omr_result, nombre_result, curp_result
+
+    async def _grade_with_microservices(
+        self,
+        file_path: str,
+        filename: str,
+        processed_image: np.ndarray,
+        regions: Dict[str, RegionBoundingBox]
+    ) -> tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+        """
+        Call the OMR and OCR services concurrently over the shared HTTP client,
+        so latency is the slowest call rather than the sum of all three.
+        """
+        region_images = await self._extract_region_images(processed_image, regions)
+        no_text = {'text': '', 'confidence': 0.0}
+
+        async def ocr(region_type: str) -> Dict[str, Any]:
+            if region_type not in region_images:
+                return no_text
+            return await self._process_ocr_region(region_images[region_type], region_type, regions[region_type])
+
+        omr_result, nombre_result, curp_result = await asyncio.gather(
+            self._process_omr_upload(file_path, filename),
+            ocr('nombre'),
+            ocr('curp'),
+            return_exceptions=True
+        )
+        # Without OMR there is nothing to grade; a failed OCR field is left empty for manual review
+        if isinstance(omr_result, BaseException):
+            raise omr_result
+        if isinstance(nombre_result, BaseException):
+            logger.warning(f"Nombre OCR failed: {nombre_result}")
+            nombre_result = no_text
+        if isinstance(curp_result, BaseException):
+            logger.warning(f"CURP OCR failed: {curp_result}")
+            curp_result = no_text
+        return omr_result, nombre_result, curp_result
 
     async def _preprocess_and_detect_regions(
         self, 
-        file_content: bytes
-    ) -> tuple[np.ndarray, Dict[str, RegionBoundingBox]]:
+        file_path: str
+    ) -> tuple[np.ndarray, np.ndarray, Dict[str, RegionBoundingBox]]:
         """Preprocess image and detect document regions using OpenCV"""
         
-        # Decode image
-        nparr = np.frombuffer(file_content, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Read and decode the spooled upload in a worker thread
+        image = await asyncio.to_thread(read_image, file_path)
         
         if image is None:
             raise ValueError("Failed to decode image")
 
         # Step 1: Image quality enhancement
-        processed = await self.image_processor.enhance_document_image(image)
+        processed, gray = await self.image_processor.enhance_document_image(image)
         
-        # Step 2: Detect document regions
-        regions = await self.image_processor.detect_document_regions(processed)
+        # Step 2: Detect document regions on the shared grayscale image
+        regions = await self.image_processor.detect_document_regions(processed, gray)
         
-        return processed, regions
+        return processed, gray, regions
 
     async def _extract_region_images(
         self, 
@@ -253,14 +466,17 @@ class DocumentOrchestrator:
     ) -> Dict[str, Any]:
         """Process OMR section using Go microservice"""
         
-        # Encode image as JPEG for transmission
-        _, buffer = cv2.imencode('.jpg', image)
-        image_bytes = buffer.tobytes()
+        # Encode image as JPEG for transmission (CPU-bound, off the event loop)
+        image_bytes = await asyncio.to_thread(encode_jpeg, image)
         
         # Call OMR service
         result = await self.omr_client.process_omr(image_bytes, 'processed_image.jpg')
         return result
 
+    async def _process_omr_upload(self, file_path: str, filename: str) -> Dict[str, Any]:
+        """Forward the spooled original upload to the OMR microservice as-is (no re-encode)"""
+        return await self.omr_client.process_omr_file(file_path, filename)
+
     async def _process_ocr_region(
         self, 
         region_image: np.ndarray, 
@@ -269,9 +485,8 @@ class DocumentOrchestrator:
     ) -> Dict[str, Any]:
         """Process individual OCR region using Node.js microservice"""
         
-        # Encode region image
-        _, buffer = cv2.imencode('.jpg', region_image)
-        image_bytes = buffer.tobytes()
+        # Encode region image (CPU-bound, off the event loop)
+        image_bytes = await asyncio.to_thread(encode_jpeg, region_image)
         
         # Prepare OCR request
         ocr_request = {
@@ -299,21 +514,20 @@ class DocumentOrchestrator:
         scan: ProcessedScan,
         omr_result: Dict[str, Any],
         nombre_result: Dict[str, Any],
-        curp_result: Dict[str, Any],
-        repository: ProcessedScanRepository
+        curp_result: Dict[str, Any]
     ) -> ProcessedScan:
         """Finalize scan with all processing results"""
         
         # Update OMR results
         scan.score = omr_result.get('score', 0)
-        scan.answers = omr_result.get('answers', [])
+        scan.answers = encode_answers(omr_result.get('answers', []))
         scan.total_questions = omr_result.get('total', 0)
         
         # Update OCR results
         scan.nombre = {
             'value': nombre_result.get('text', '').strip(),
             'confidence': nombre_result.get('confidence', 0.0),
-            'needsReview': nombre_result.get('confidence', 0.0) < 0.8,
+            'needsReview': nombre_result.get('confidence', 0.0) < NOMBRE_REVIEW_CONFIDENCE,
             'correctedBy': None,
             'correctedAt': None
         }
@@ -321,7 +535,7 @@ class DocumentOrchestrator:
         scan.curp = {
             'value': curp_result.get('text', '').strip(),
             'confidence': curp_result.get('confidence', 0.0),
-            'needsReview': curp_result.get('confidence', 0.0) < 0.9 or not self._is_valid_curp_format(curp_result.get('text', '')),
+            'needsReview': curp_result.get('confidence', 0.0) < CURP_REVIEW_CONFIDENCE or not self._is_valid_curp_format(curp_result.get('text', '')),
             'correctedBy': None,
             'correctedAt': None
         }
@@ -337,17 +551,26 @@ class DocumentOrchestrator:
         )
         
         scan.status = ScanStatus.NEEDS_REVIEW if needs_review else ScanStatus.COMPLETED
-        scan.processed_time = datetime.utcnow()
         
-        # Save final results
-        await repository.update(scan)
+        # Save final results in a single terminal UPDATE (processed_time set by the DB)
+        scan = await self._finalize_scan(scan)
+        if scan.file_hash is not None:
+            await remember_processed_scan(scan.file_hash, scan.id, scan.status)
         return scan
 
+    async def _create_scan(self, scan: ProcessedScan) -> ProcessedScan:
+        """Insert the scan row, committed immediately so listings show it while queued"""
+        async with scan_repository_scope() as repository:
+            return await repository.create(scan)
+
+    async def _finalize_scan(self, scan: ProcessedScan) -> ProcessedScan:
+        """Persist the terminal state in its own transaction"""
+        async with scan_repository_scope() as repository:
+            return await repository.finalize(scan)
+
     def _is_valid_curp_format(self, curp: str) -> bool:
         """Basic CURP format validation"""
-        import re
-        curp_pattern = r'^[A-Z]{4}\d{6}[HM][A-Z]{5}\d{2}$'
-        return bool(re.match(curp_pattern, curp.strip()))
+        return is_valid_curp(curp.strip())
 
 # Initialize orchestrator
 orchestrator = DocumentOrchestrator()
@@ -360,6 +583,15 @@ class TemplateCreate(BaseModel):
     total_questions: int
     correct_answers: List[str]
 
+    @field_validator("correct_answers")
+    @classmethod
+    def _answers_are_choices(cls, answers: List[str]) -> List[str]:
+        # Rejected here (422) rather than failing every later export of the template
+        invalid = sorted({answer for answer in answers if len(answer) != 1 or answer not in ANSWER_CHOICES})
+        if invalid:
+            raise ValueError(f"Invalid answers {invalid}; each must be one of {', '.join(ANSWER_CHOICES)}")
+        return answers
+
 class TemplateResponse(BaseModel):
     id: str
     name: str
@@ -407,14 +639,25 @@ async def list_templates():
                 correct_answers=tm.correct_answers
             ) for tm in tms
         ]
-@app.post("/api/v1/scans", response_model=dict)
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuse declared-oversize uploads before the multipart body is read and spooled"""
+    if request.method == "POST" and request.url.path == "/api/v1/scans":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() \
+                and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+            return OrjsonResponse({"detail": "File too large. Maximum size is 10MB."}, status_code=413)
+    return await call_next(request)
+
+@app.post("/api/v1/scans", response_model=dict, status_code=202, dependencies=[Depends(limit_upload_rate)])
 async def upload_scan(
     file: UploadFile,
     background_tasks: BackgroundTasks,
+    response: Response,
     template_id: Optional[str] = Form(None),
-    repository: ProcessedScanRepository = Depends(get_scan_repository)
+    force_reprocess: bool = False
 ):
-    """Upload and process a document scan"""
+    """Upload and process a document scan; identical re-uploads return the existing scan"""
     
     if not file.content_type.startswith('image/'):
         raise HTTPException(
@@ -424,31 +667,69 @@ async def upload_scan(
     
     try:
         # Generate scan identifier
-        scan_id = str(uuid4())
-        # Read file content
-        file_content = await file.read()
-        
-        if len(file_content) > 10 * 1024 * 1024:  # 10MB limit
-            raise HTTPException(
-                status_code=400,
-                detail="File too large. Maximum size is 10MB."
-            )
-        
-        # Start background processing with provided scan_id
-        background_tasks.add_task(
-            orchestrator.process_document,
-            scan_id,
-            file_content,
-            file.filename or "unknown.jpg",
-            repository
-        )
+        scan_id = str(uuid7())
+        # Stream the upload to disk; memory stays at one chunk regardless of file size
+        file_path = os.path.join(UPLOAD_DIR, f"{scan_id}.upload")
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        # Type and dimensions come from the header bytes; bad uploads never reach the disk
+        is_valid, error = file_validator.validate_upload(chunk[:HEADER_BYTES])
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=error)
+        size = 0
+        # Hashed incrementally while spooling, so the upload is never read twice
+        hasher = file_validator.new_file_hasher()
+        try:
+            async with aiofiles.open(file_path, "wb") as out:
+                while chunk:
+                    size += len(chunk)
+                    if size > MAX_UPLOAD_BYTES:
+                        # Same answer as reject_oversized_uploads for a body with no Content-Length
+                        raise HTTPException(
+                            status_code=413,
+                            detail="File too large. Maximum size is 10MB."
+                        )
+                    hasher.update(chunk)
+                    await out.write(chunk)
+                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        except BaseException:
+            # Oversize, client disconnect or write error: drop the partial spool
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            raise
+        file_hash = hasher.digest()
+
+        # The spooled upload is removed if the dedup lookup or the insert fails
+        try:
+            existing = None if force_reprocess else await find_processed_scan(file_hash)
+            if existing is None:
+                # The row exists (QUEUED) before the 202 goes out, so the scan is visible while it waits
+                scan = await orchestrator.queue_scan(scan_id, file.filename or "unknown.jpg", file_hash)
+        except Exception:
+            os.remove(file_path)
+            raise
+        if existing is not None:
+            existing_id, existing_status = existing
+            os.remove(file_path)
+            response.status_code = 200
+            return {
+                "id": existing_id,
+                "message": "Identical document already processed",
+                "filename": file.filename,
+                "status": existing_status,
+                "deduped": True
+            }
+        background_tasks.add_task(orchestrator.process_document, scan, file_path)
         return {
             "id": scan_id,
-            "message": "Document uploaded successfully and processing started",
+            "message": "Document uploaded successfully and queued for processing",
             "filename": file.filename,
-            "status": "PROCESSING"
+            "status": ScanStatus.QUEUED
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
@@ -456,25 +737,19 @@ async def upload_scan(
 @app.get("/api/v1/scans")
 async def list_scans(
     status: Optional[str] = None,
-    limit: int = 20,
-    offset: int = 0,
+    # Bounded here: out-of-range values would otherwise reach LIMIT/OFFSET in SQL
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
     repository: ProcessedScanRepository = Depends(get_scan_repository)
 ):
     """List processed scans with optional filtering and pagination"""
-    # Retrieve all scans
-    all_scans = await repository.get_all()
-    # Optional status filtering
-    if status:
-        all_scans = [s for s in all_scans if s.status.value == status]
-    total = len(all_scans)
-    # Apply pagination
-    sliced = all_scans[offset: offset + limit]
-    return {
-        "scans": [scan.to_dict() for scan in sliced],
+    scans, total = await repository.list_scans(status, limit, offset)
+    return OrjsonResponse({
+        "scans": [scan.to_dict() for scan in scans],
         "total": total,
         "limit": limit,
         "offset": offset
-    }
+    })
 
 @app.get("/api/v1/scans/{scan_id}")
 async def get_scan(
@@ -482,18 +757,23 @@ async def get_scan(
     repository: ProcessedScanRepository = Depends(get_scan_repository)
 ):
     """Get detailed scan information"""
-    
+    # Processed scans are served from the snapshot written with their results
+    payload = await repository.get_response_json(scan_id)
+    if payload is not None:
+        return Response(content=payload, media_type="application/json")
+
     scan = await repository.get_by_id(scan_id)
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
     
-    return scan.to_dict()
+    return OrjsonResponse(scan.to_dict())
 
 @app.patch("/api/v1/scans/{scan_id}")
 async def update_scan(
     scan_id: str,
     updates: dict,
-    repository: ProcessedScanRepository = Depends(get_scan_repository)
+    background_tasks: BackgroundTasks,
+    repository: ProcessedScanRepository = Depends(get_committed_scan_repository)
 ):
     """Update scan data (for manual corrections)"""
     
@@ -517,7 +797,44 @@ async def update_scan(
         scan.status = ScanStatus.COMPLETED
     
     await repository.update(scan)
-    return scan.to_dict()
+    if scan.file_hash is not None:
+        # Runs only once the correction is committed; a failed commit never reaches the cache
+        background_tasks.add_task(remember_processed_scan, scan.file_hash, scan.id, scan.status)
+    return OrjsonResponse(scan.to_dict())
+
+excel_export_service = OpenpyxlExcelExportService()
+
+@app.get("/api/v1/exports/{scan_id}")
+async def export_scan(
+    scan_id: str,
+    format: str = "xlsx",
+    template_id: Optional[str] = None,
+    repository: ProcessedScanRepository = Depends(get_scan_repository),
+    session: AsyncSession = Depends(db_config.get_session)
+):
+    """Download scan results; with a template the answers are scored per question"""
+    if format != "xlsx":
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+
+    scan = await repository.get_by_id(scan_id)
+    if not scan:
+        raise HTTPException(status_code=404, detail="Scan not found")
+
+    answer_key = None
+    if template_id:
+        from .infrastructure.database import TemplateModel
+        tm = await session.get(TemplateModel, template_id)
+        if not tm:
+            raise HTTPException(status_code=404, detail="Template not found")
+        answer_key = get_answer_key(str(tm.id), tm.correct_answers)
+
+    path = await excel_export_service.create_report(scan, answer_key)
+    return FileResponse(
+        path,
+        media_type=XLSX_MEDIA_TYPE,
+        filename=f"scan_{scan_id}.xlsx",
+        background=BackgroundTask(os.remove, path)
+    )
 
 from .routers.health import router as health_router
 app.include_router(health_router)
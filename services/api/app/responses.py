@@ -0,0 +1,17 @@
+"""
+Response classes shared by the API endpoints.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class OrjsonResponse(JSONResponse):
+    """
+    JSON response rendered by orjson. Returned directly from endpoints without a
+    response model, it skips FastAPI's jsonable_encoder pass; datetimes, UUIDs
+    and str enums are serialized natively.
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
@@ -2,16 +2,23 @@ from fastapi import APIRouter
 from sqlalchemy import select
 from fastapi import HTTPException
 
-from ..main_bubblegrade import async_session, logger
+from ..main_bubblegrade import async_session, logger, response_cache
 
 router = APIRouter()
 
+# A successful DB check is reused briefly, so probes from every replica don't each hit the DB
+HEALTH_CACHE_KEY = "health:v1"
+HEALTH_CACHE_TTL = 5
+
 @router.get("/health")
 async def health_check():
     """Comprehensive health check: database connectivity (best-effort)"""
+    if await response_cache.get(HEALTH_CACHE_KEY) is not None:
+        return {"status": "healthy"}
     try:
         async with async_session() as session:
             await session.execute(select(1))
+        await response_cache.set(HEALTH_CACHE_KEY, b"1", HEALTH_CACHE_TTL)
     except Exception as e:
         logger.warning(f"Health check: DB unreachable: {e}")
     return {"status": "healthy"}
\ No newline at end of file
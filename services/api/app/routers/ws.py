@@ -1,15 +1,23 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from ..services.ws_manager import manager
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket
+from ..services.ws_manager import ALL_SCANS, manager
 
 router = APIRouter()
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for clients to receive scan progress updates."""
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, scan_id: Optional[str] = None):
+    """
+    WebSocket endpoint for clients to receive scan progress updates:
+    for one scan with ?scan_id=..., otherwise for every scan.
+    """
+    await manager.connect(websocket, scan_id or ALL_SCANS)
     try:
         while True:
-            # Keep connection open; clients do not need to send messages
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
\ No newline at end of file
+            # Clients do not need to send messages: read raw frames (text or bytes) and
+            # drop them without decoding; frame size is capped by uvicorn's --ws-max-size
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        manager.disconnect(websocket)
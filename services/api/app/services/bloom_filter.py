@@ -0,0 +1,114 @@
+"""
+In-process Bloom filter over upload digests, consulted before the duplicate-upload
+database lookup: most uploads are new files, and a negative answer is definitive as
+long as the filter has seen every processed upload (see BloomFilterRelay).
+"""
+import asyncio
+import logging
+import math
+from typing import Awaitable, Callable, Optional
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+__all__ = ["BloomFilter", "BloomFilterRelay"]
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel carrying every worker's filter additions
+BLOOM_CHANNEL = "bubblegrade:dedup-filter"
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter keyed by file digests. The digests are already uniformly
+    distributed, so the bit positions come from their first 16 bytes (double hashing)
+    rather than from rehashing. Past ``capacity`` items the false-positive rate rises,
+    which only costs extra database lookups.
+
+    Until ``ready`` is set, every lookup reports a possible member so callers fall
+    through to the database.
+    """
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.ready = False
+
+    def _positions(self, digest: bytes):
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, digest: bytes) -> None:
+        for pos in self._positions(digest):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        if not self.ready:
+            return True
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+
+class BloomFilterRelay:
+    """
+    Keeps the per-process filters of all API workers in step over Redis pub/sub: every
+    addition is published, and each worker applies what it receives.
+
+    The filter is only marked ready while this worker is subscribed and has loaded the
+    existing hashes (after the subscription took effect, so nothing falls in between).
+    Losing the subscription clears ``ready`` until it is re-established and reloaded,
+    so a negative answer is never based on a filter that missed additions. Without
+    Redis the filter is never ready and every check goes to the database.
+    """
+    def __init__(self, bloom: BloomFilter, load: Callable[[], Awaitable[None]]):
+        self.bloom = bloom
+        self._load = load
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, redis_url: str) -> None:
+        if not redis_url or aioredis is None or self._redis is not None:
+            return
+        self._redis = aioredis.from_url(redis_url)
+        self._task = asyncio.create_task(self._run())
+
+    async def publish(self, digest: bytes) -> None:
+        self.bloom.add(digest)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.publish(BLOOM_CHANNEL, digest)
+        except Exception as e:
+            logger.warning(f"Duplicate filter publish failed: {e}")
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def _run(self):
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(BLOOM_CHANNEL)
+                    async for item in pubsub.listen():
+                        if item["type"] == "subscribe":
+                            # Additions published from here on are buffered on the subscription
+                            await self._load()
+                            self.bloom.ready = True
+                        elif item["type"] == "message":
+                            self.bloom.add(item["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Duplicate filter relay interrupted, resubscribing and reloading: {e}")
+                await asyncio.sleep(1)
+            finally:
+                # Additions may be missed until the next subscribe-and-load completes
+                self.bloom.ready = False
@@ -0,0 +1,66 @@
+"""
+Lookaside cache for hot, stable reads (duplicate-upload lookups, health checks).
+Redis-backed when REDIS_URL is configured; otherwise every lookup is a miss.
+"""
+import logging
+from typing import Optional
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+class RedisCache:
+    """
+    Thin async cache over Redis. Errors are logged and treated as misses, so an
+    unavailable cache never fails a request.
+    """
+    def __init__(self, redis_url: str):
+        self._redis = aioredis.from_url(redis_url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self._redis.get(key)
+        except Exception as e:
+            logger.warning(f"Cache get failed for {key}: {e}")
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        try:
+            await self._redis.set(key, value, ex=ttl)
+        except Exception as e:
+            logger.warning(f"Cache set failed for {key}: {e}")
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self._redis.delete(key)
+        except Exception as e:
+            logger.warning(f"Cache delete failed for {key}: {e}")
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+class NullCache:
+    """Cache stand-in when Redis is not configured: always misses."""
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        pass
+
+    async def delete(self, key: str) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+def create_cache(redis_url: str = ""):
+    """Redis cache when REDIS_URL is set and redis is installed, else a no-op cache."""
+    if redis_url and aioredis is not None:
+        return RedisCache(redis_url)
+    return NullCache()
@@ -0,0 +1,133 @@
+"""
+Excel export of graded scans, scored against a template answer key.
+"""
+import asyncio
+import os
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from openpyxl.styles import Font, PatternFill
+
+from ..domain.entities import ANSWER_CHOICES, BLANK_ANSWER, ProcessedScan, encode_answers
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Result column palette, indexed by correctness (False, True)
+RESULT_MARKS = ("✗", "✓")
+RESULT_FILLS = (
+    PatternFill(start_color="FFB6C1", end_color="FFB6C1", fill_type="solid"),
+    PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid"),
+)
+HEADER_FONT = Font(bold=True)
+
+# Answer keys as ordinal arrays, keyed by template id (templates are immutable once created)
+_answer_keys: Dict[str, np.ndarray] = {}
+
+
+def compile_answer_key(correct_answers: Sequence[str]) -> np.ndarray:
+    """Convert a template's letter answer key to an ordinal array for vectorized scoring"""
+    return np.asarray(encode_answers(correct_answers), dtype=np.int8)
+
+
+def get_answer_key(template_id: str, correct_answers: Sequence[str]) -> np.ndarray:
+    """Return the compiled answer key for a template, compiling it on first use"""
+    key = _answer_keys.get(template_id)
+    if key is None:
+        key = _answer_keys[template_id] = compile_answer_key(correct_answers)
+    return key
+
+
+def score_answers(answers: Optional[array], key: np.ndarray) -> np.ndarray:
+    """Per-question correctness as a boolean array; blanks never match"""
+    if not answers:
+        return np.zeros(0, dtype=bool)
+    # Zero-copy view over the signed-byte answer buffer
+    marked = np.frombuffer(answers, dtype=np.int8)
+    n = min(marked.size, key.size)
+    return (marked[:n] == key[:n]) & (marked[:n] != BLANK_ANSWER)
+
+
+def _letter(ordinal: int) -> str:
+    return ANSWER_CHOICES[ordinal] if 0 <= ordinal < len(ANSWER_CHOICES) else ""
+
+
+class OpenpyxlExcelExportService:
+    """Builds the per-scan results workbook"""
+
+    async def create_report(self, scan: ProcessedScan, answer_key: Optional[np.ndarray] = None) -> Path:
+        """Write the report to a temporary .xlsx file; the caller owns (and removes) the file"""
+        # Building and zipping the workbook is blocking CPU/IO work; keep it off the event loop
+        return await asyncio.to_thread(self._create_report, scan, answer_key)
+
+    def _create_report(self, scan: ProcessedScan, answer_key: Optional[np.ndarray]) -> Path:
+        answers = scan.answers if scan.answers is not None else array('b')
+        correct = score_answers(answers, answer_key) if answer_key is not None else None
+
+        score = int(correct.sum()) if correct is not None else scan.score
+        summary = [
+            ["Scan", str(scan.id)],
+            ["Archivo", scan.filename],
+            ["Nombre", (scan.nombre or {}).get('value', '')],
+            ["CURP", (scan.curp or {}).get('value', '')],
+            ["Puntaje", score],
+        ]
+        headers = ["Pregunta", "Respuesta"]
+        if correct is not None:
+            headers += ["Correcta", "Resultado"]
+
+        # Write-only sheets need column dimensions before the first row; question rows
+        # only hold the question number and single letters/marks, so their widths are
+        # known up front and rows can be emitted in one pass with no buffering
+        widths = [len(h) for h in headers]
+        widths[0] = max(widths[0], len(str(len(answers))))
+        for row in summary:
+            for j, value in enumerate(row):
+                widths[j] = max(widths[j], len(str(value)) if value is not None else 0)
+
+        # Write-only workbook: each row is serialized on append instead of kept as Cell objects
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Bubble Sheet Results")
+        for j, width in enumerate(widths):
+            ws.column_dimensions[get_column_letter(j + 1)].width = width + 2
+
+        for row in summary:
+            ws.append(row)
+        ws.append([])
+        header_cells = []
+        for h in headers:
+            cell = WriteOnlyCell(ws, value=h)
+            cell.font = HEADER_FONT
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        if correct is not None:
+            # Pad to the answer count so every question has a verdict and a key letter
+            verdicts = np.zeros(len(answers), dtype=bool)
+            verdicts[:correct.size] = correct
+            key_letters = [_letter(int(o)) for o in answer_key[:len(answers)]]
+            key_letters += [""] * (len(answers) - len(key_letters))
+
+        for i in range(len(answers)):
+            row = [i + 1, scan.answer_at(i)]
+            if correct is not None:
+                ok = int(verdicts[i])
+                result = WriteOnlyCell(ws, value=RESULT_MARKS[ok])
+                result.fill = RESULT_FILLS[ok]
+                row += [key_letters[i], result]
+            ws.append(row)
+
+        # Saved straight to disk: no in-memory buffer plus getvalue() copy of the whole file
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            wb.save(path)
+        except Exception:
+            os.remove(path)
+            raise
+        return Path(path)
@@ -0,0 +1,151 @@
+"""
+Upload validation: file type sniffing, header-based dimension checks and file hashing.
+"""
+import hashlib
+import logging
+import os
+import struct
+from typing import Optional, Tuple
+
+# BLAKE3 and XXH3 are SIMD-accelerated and several times faster than SHA-256 for dedup
+# hashing; file_hash is BYTEA, so digests of any length fit
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+# Upload hash: blake3 (default), xxh3 (128-bit, fastest, non-cryptographic) or sha256.
+# Changing it only means earlier uploads are no longer recognized as duplicates.
+HASH_ALGO = os.getenv("HASH_ALGO", "blake3").lower()
+
+# Supported algorithms, fastest first; one whose package is missing falls back to the next
+HASH_ALGOS = ("xxh3", "blake3", "sha256")
+_INSTALLED_HASH_ALGOS = {"xxh3": xxhash is not None, "blake3": blake3 is not None, "sha256": True}
+
+
+def _resolve_hash_algo(requested: str) -> str:
+    """Algorithm actually used for HASH_ALGO; an unknown name fails at import, i.e. at startup."""
+    if requested not in HASH_ALGOS:
+        raise ValueError(f"Unknown HASH_ALGO {requested!r}; expected one of {', '.join(HASH_ALGOS)}")
+    used = next(algo for algo in HASH_ALGOS[HASH_ALGOS.index(requested):] if _INSTALLED_HASH_ALGOS[algo])
+    if used != requested:
+        # Dedup keys differ from those of deployments that have the requested package
+        logger.warning(f"HASH_ALGO={requested} is not installed; hashing uploads with {used}")
+    return used
+
+
+# Effective upload hash, logged above when it differs from HASH_ALGO
+FILE_HASH_ALGO = _resolve_hash_algo(HASH_ALGO)
+
+# Bytes of the upload needed to sniff the type and read JPEG/PNG dimensions
+HEADER_BYTES = 64 * 1024
+
+ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/tiff", "image/bmp", "image/webp"}
+MIN_IMAGE_DIMENSION = 200
+# Guards against decompression bombs before OpenCV allocates the full bitmap
+MAX_IMAGE_DIMENSION = 12000
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# SOFn markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) do not
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field
+_JPEG_STANDALONE_MARKERS = frozenset({0x01, 0xD8, *range(0xD0, 0xD8)})
+
+
+class FileValidator:
+    """Validates uploaded images from their leading bytes, without decoding pixels."""
+
+    def validate_upload(self, header: bytes) -> Tuple[bool, Optional[str]]:
+        """
+        Validate an upload from its first HEADER_BYTES bytes.
+        Returns (is_valid, error_message).
+        """
+        mime = self._sniff_mime(header)
+        error = self.validate_file_type(mime) or self.validate_image_dimensions(mime, header)
+        return error is None, error
+
+    def validate_file_type(self, mime: Optional[str]) -> Optional[str]:
+        if mime not in ALLOWED_IMAGE_TYPES:
+            return "Invalid file type. Only images are supported."
+        return None
+
+    def validate_image_dimensions(self, mime: Optional[str], header: bytes) -> Optional[str]:
+        dimensions = self._read_dimensions_from_header(mime, header)
+        if dimensions is None:
+            # Formats without a parsed header are checked when OpenCV decodes them
+            return None
+        width, height = dimensions
+        if not (MIN_IMAGE_DIMENSION <= width <= MAX_IMAGE_DIMENSION
+                and MIN_IMAGE_DIMENSION <= height <= MAX_IMAGE_DIMENSION):
+            return (
+                f"Invalid image dimensions {width}x{height}. Width and height must be "
+                f"between {MIN_IMAGE_DIMENSION} and {MAX_IMAGE_DIMENSION} pixels."
+            )
+        return None
+
+    @staticmethod
+    def new_file_hasher():
+        """Incremental hasher for duplicate detection (not a security boundary)."""
+        # 128-bit XXH3: a 64-bit digest would make dedup collisions plausible at scale
+        if FILE_HASH_ALGO == "xxh3":
+            return xxhash.xxh3_128()
+        if FILE_HASH_ALGO == "blake3":
+            return blake3.blake3()
+        return hashlib.sha256()
+
+    def calculate_file_hash(self, file_content: bytes) -> bytes:
+        """Raw digest of a complete upload."""
+        hasher = self.new_file_hasher()
+        hasher.update(file_content)
+        return hasher.digest()
+
+    @staticmethod
+    def _sniff_mime(header: bytes) -> Optional[str]:
+        """Identify the image type from its signature bytes."""
+        if header[:3] == b"\xff\xd8\xff":
+            return "image/jpeg"
+        if header[:8] == PNG_SIGNATURE:
+            return "image/png"
+        if header[:4] in (b"II*\x00", b"MM\x00*"):
+            return "image/tiff"
+        if header[:2] == b"BM":
+            return "image/bmp"
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return "image/webp"
+        return None
+
+    @staticmethod
+    def _read_dimensions_from_header(mime: Optional[str], buf: bytes) -> Optional[Tuple[int, int]]:
+        """Return (width, height) from the PNG IHDR or JPEG SOFn segment, or None if not found."""
+        if mime == "image/png":
+            if len(buf) < 24 or buf[12:16] != b"IHDR":
+                return None
+            width, height = struct.unpack(">II", buf[16:24])
+            return width, height
+        if mime == "image/jpeg":
+            i = 2
+            while i + 4 <= len(buf):
+                if buf[i] != 0xFF:
+                    return None
+                marker = buf[i + 1]
+                if marker == 0xFF:  # fill byte
+                    i += 1
+                    continue
+                if marker in _JPEG_STANDALONE_MARKERS:
+                    i += 2
+                    continue
+                if marker in _JPEG_SOF_MARKERS:
+                    if i + 9 > len(buf):
+                        return None
+                    height, width = struct.unpack(">HH", buf[i + 5:i + 9])
+                    return width, height
+                (length,) = struct.unpack(">H", buf[i + 2:i + 4])
+                i += 2 + length
+        return None
@@ -0,0 +1,104 @@
+"""
+grading_pool.py
+
+Process pool for the CPU-bound OMR/OCR grading step.
+Images reach the workers through shared memory instead of being pickled.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..domain.entities import RegionBoundingBox
+from .omr_ocr import grade_scan, preload_ocr
+
+__all__ = ["GradingPool"]
+
+
+def _init_worker() -> None:
+    # One OpenCV thread per worker process; parallelism comes from the pool
+    cv2.setNumThreads(1)
+    preload_ocr()
+
+
+def _grade_shared(
+    shm_name: str,
+    shape: Tuple[int, ...],
+    dtype: str,
+    regions: Dict[str, RegionBoundingBox]
+) -> Dict[str, Any]:
+    """Worker entry point: grade the image published in shared memory by the parent."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        try:
+            return grade_scan(image, regions)
+        finally:
+            # Drop the view before closing, or the buffer cannot be released
+            del image
+    finally:
+        shm.close()
+
+
+def _warm_up() -> None:
+    """Exercise the OpenCV grading path once so first-scan initialization happens at startup."""
+    image = np.zeros((64, 64, 3), dtype=np.uint8)
+    grade_scan(image, {'omr': RegionBoundingBox(0, 0, 64, 64)})
+
+
+class GradingPool:
+    """
+    Runs grade_scan in worker processes so concurrent scans are not serialized by the GIL.
+    Falls back to the default thread executor until started.
+    """
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._executor is None:
+            # spawn: the parent runs an event loop and logging threads, which fork would copy
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+
+    async def warm_up(self) -> None:
+        """Spawn every worker and run a dummy grading in each before the first scan arrives."""
+        if self._executor is None:
+            return
+        loop = asyncio.get_running_loop()
+        # Concurrent submissions make the executor start all max_workers processes
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _warm_up) for _ in range(self.max_workers)
+        ))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def aclose(self) -> None:
+        """Like shutdown(), but the workers drain in a thread so the event loop keeps running"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    async def grade(self, image: np.ndarray, regions: Dict[str, RegionBoundingBox]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            return await loop.run_in_executor(None, grade_scan, image, regions)
+        shm = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+        try:
+            np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+            return await loop.run_in_executor(
+                self._executor, _grade_shared, shm.name, image.shape, image.dtype.str, regions
+            )
+        finally:
+            shm.close()
+            shm.unlink()
@@ -1,50 +1,87 @@
 """
 Image processing utilities for document enhancement and region detection.
 """
+import asyncio
+import threading
 import cv2
 import numpy as np
 
-from typing import Dict
+from typing import Dict, Optional, Tuple
 from ..domain.entities import RegionBoundingBox
 
+# CLAHE objects hold per-call state, so each worker thread reuses its own instead
+# of creating one per image
+_thread_local = threading.local()
+
+# Long side of the thumbnail used to find the document outline
+DETECTION_MAX_SIDE = 1024
+
+
+def _clahe() -> cv2.CLAHE:
+    clahe = getattr(_thread_local, 'clahe', None)
+    if clahe is None:
+        clahe = _thread_local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return clahe
+
 
 class ImageProcessor:
     """
     Handles document image enhancement and simple region detection.
     Stub implementations provided; replace with real OpenCV logic.
     """
-    async def enhance_document_image(self, image: np.ndarray) -> np.ndarray:
+    async def enhance_document_image(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
         Apply image enhancement: denoise with bilateral filter and apply CLAHE.
-        Returns a color image ready for region detection.
+        Returns the enhanced color image and its grayscale version, computed once
+        for region detection and grading.
+        Runs in a worker thread so the event loop is not blocked.
         """
+        return await asyncio.to_thread(self._enhance_document_image, image)
+
+    def _enhance_document_image(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         # Denoise with bilateral filter
         denoised = cv2.bilateralFilter(image, d=9, sigmaColor=75, sigmaSpace=75)
-        # Convert to LAB color space for CLAHE on the L channel
-        lab = cv2.cvtColor(denoised, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        cl = clahe.apply(l)
-        merged = cv2.merge((cl, a, b))
+        # CLAHE on the L channel of LAB; both conversions reuse the denoised buffer. The
+        # strided L view is copied into and out of CLAHE (one channel each way), which
+        # still avoids split/merge allocating all three channels
+        lab = cv2.cvtColor(denoised, cv2.COLOR_BGR2LAB, dst=denoised)
+        lab[:, :, 0] = _clahe().apply(lab[:, :, 0])
         # Convert back to BGR
-        enhanced = cv2.cvtColor(merged, cv2.COLOR_LAB2BGR)
-        return enhanced
+        enhanced = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst=lab)
+        return enhanced, cv2.cvtColor(enhanced, cv2.COLOR_BGR2GRAY)
 
     async def detect_document_regions(
-        self, processed: np.ndarray
+        self, processed: np.ndarray, gray: Optional[np.ndarray] = None
     ) -> Dict[str, RegionBoundingBox]:
         """
         Detect document boundary via contour approximation, then compute
         relative regions for bubbles (OMR), name, and CURP.
+        Pass the grayscale image from enhance_document_image to skip the conversion.
+        Runs in a worker thread so the event loop is not blocked.
         """
-        h, w = processed.shape[:2]
+        return await asyncio.to_thread(self._detect_document_regions, processed, gray)
+
+    def _detect_document_regions(
+        self, processed: np.ndarray, gray: Optional[np.ndarray] = None
+    ) -> Dict[str, RegionBoundingBox]:
+        if gray is None:
+            gray = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape[:2]
+        # The outline search only needs a thumbnail; boxes are scaled back afterwards
+        scale = min(1.0, DETECTION_MAX_SIDE / max(h, w))
+        small = gray if scale == 1.0 else cv2.resize(
+            gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+        )
         # Edge detection to find document outline
-        gray = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        blurred = cv2.GaussianBlur(small, (5, 5), 0)
         edged = cv2.Canny(blurred, 50, 150)
         contours, _ = cv2.findContours(edged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         doc_cnt = None
-        for c in sorted(contours, key=cv2.contourArea, reverse=True):
+        # Areas computed once and ranked with a stable argsort (largest first); polygons
+        # are only approximated until the first quadrilateral is found
+        areas = np.fromiter((cv2.contourArea(c) for c in contours), dtype=np.float64, count=len(contours))
+        for i in np.argsort(-areas, kind='stable'):
+            c = contours[i]
             peri = cv2.arcLength(c, True)
             approx = cv2.approxPolyDP(c, 0.02 * peri, True)
             if len(approx) == 4:
@@ -52,6 +89,9 @@ class ImageProcessor:
                 break
         if doc_cnt is not None:
             x, y, w_box, h_box = cv2.boundingRect(doc_cnt)
+            if scale != 1.0:
+                x, y = int(x / scale), int(y / scale)
+                w_box, h_box = min(w - x, round(w_box / scale)), min(h - y, round(h_box / scale))
         else:
             x, y, w_box, h_box = 0, 0, w, h
         # Compute relative ROIs
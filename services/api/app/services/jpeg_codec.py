@@ -0,0 +1,44 @@
+"""
+JPEG decoding of uploads and encoding for images sent to the microservices.
+Uses libjpeg-turbo via PyTurboJPEG when available, falling back to OpenCV.
+"""
+from typing import Optional
+
+import cv2
+import numpy as np
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbo = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    # Package missing or libturbojpeg not found on the system
+    _turbo = None
+
+JPEG_QUALITY = 85
+
+
+def encode_jpeg(image: np.ndarray, quality: int = JPEG_QUALITY) -> bytes:
+    """Encode a BGR or grayscale image as JPEG bytes."""
+    if _turbo is not None:
+        return _turbo.encode(image, quality=quality)
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Failed to encode image as JPEG")
+    return buffer.tobytes()
+
+
+def decode_image(data: bytes) -> Optional[np.ndarray]:
+    """Decode an uploaded image to BGR; returns None if it cannot be decoded."""
+    if _turbo is not None and data[:3] == b"\xff\xd8\xff":
+        try:
+            return _turbo.decode(data, pixel_format=TJPF_BGR)
+        except (OSError, ValueError):
+            # Corrupt or unusual JPEG variants: let OpenCV try
+            pass
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def read_image(path: str) -> Optional[np.ndarray]:
+    """Read and decode an image file (blocking; call from a worker thread)."""
+    with open(path, "rb") as f:
+        return decode_image(f.read())
@@ -1,11 +1,17 @@
-import json
 import logging
-from typing import Any, Dict
+import secrets
+from typing import Any, Dict, Optional
 
+import aiofiles
+import aiofiles.os
 import httpx
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Read size when streaming files from disk to a microservice
+STREAM_CHUNK_SIZE = 1 << 20
+
 
 class MicroserviceClient:
     """
@@ -16,11 +22,39 @@ class MicroserviceClient:
         self,
         omr_url: str,
         ocr_url: str,
+        client: Optional[httpx.AsyncClient] = None,
         timeout: float = 60.0
     ):
         self.omr_url = omr_url.rstrip('/')
         self.ocr_url = ocr_url.rstrip('/')
         self.timeout = timeout
+        # Pooled client shared with the application; its owner (the FastAPI lifespan)
+        # opens and closes it, so connections are reused across scans
+        self._client = client
+        self._owns_client = False
+
+    def bind(self, client: httpx.AsyncClient) -> None:
+        """Use the given pooled client for all subsequent requests."""
+        self._client = client
+        self._owns_client = False
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Outside the app lifespan (scripts, tests) build one pooled client on first use
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+            )
+            self._owns_client = True
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the client if this instance created it; a bound client is closed by its owner."""
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._owns_client = False
 
     async def process_omr(self, image_bytes: bytes, filename: str) -> Dict[str, Any]:
         """
@@ -28,11 +62,48 @@ class MicroserviceClient:
         """
         endpoint = f"{self.omr_url}/grade"
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                files = {"file": (filename, image_bytes, "image/jpeg")}
-                response = await client.post(endpoint, files=files)
-                response.raise_for_status()
-                return response.json()
+            files = {"file": (filename, image_bytes, "image/jpeg")}
+            response = await self.client.post(endpoint, files=files)
+            response.raise_for_status()
+            return orjson.loads(response.content)
+        except Exception as e:
+            logger.error(f"OMR service error at {endpoint}: {e}")
+            raise
+
+    async def process_omr_file(self, file_path: str, filename: str, content_type: str = "image/jpeg") -> Dict[str, Any]:
+        """
+        Send a file on disk to the OMR service without loading it into memory.
+        The multipart body is streamed from aiofiles reads, so disk I/O never blocks the event loop.
+        """
+        endpoint = f"{self.omr_url}/grade"
+        boundary = secrets.token_hex(16)
+        safe_name = filename.replace('"', '%22')
+        head = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="file"; filename="{safe_name}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        ).encode()
+        tail = f'\r\n--{boundary}--\r\n'.encode()
+        size = (await aiofiles.os.stat(file_path)).st_size
+
+        async def body():
+            yield head
+            async with aiofiles.open(file_path, "rb") as f:
+                while chunk := await f.read(STREAM_CHUNK_SIZE):
+                    yield chunk
+            yield tail
+
+        try:
+            response = await self.client.post(
+                endpoint,
+                content=body(),
+                headers={
+                    "Content-Type": f"multipart/form-data; boundary={boundary}",
+                    "Content-Length": str(len(head) + size + len(tail))
+                }
+            )
+            response.raise_for_status()
+            return orjson.loads(response.content)
         except Exception as e:
             logger.error(f"OMR service error at {endpoint}: {e}")
             raise
@@ -43,12 +114,11 @@ class MicroserviceClient:
         """
         endpoint = f"{self.ocr_url}/ocr"
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                files = {"image": (ocr_request.get('region', 'region') + ".jpg", image_bytes, "image/jpeg")}
-                data = {"request": json.dumps(ocr_request)}
-                response = await client.post(endpoint, data=data, files=files)
-                response.raise_for_status()
-                return response.json()
+            files = {"image": (ocr_request.get('region', 'region') + ".jpg", image_bytes, "image/jpeg")}
+            data = {"request": orjson.dumps(ocr_request).decode()}
+            response = await self.client.post(endpoint, data=data, files=files)
+            response.raise_for_status()
+            return orjson.loads(response.content)
         except Exception as e:
             logger.error(f"OCR service error at {endpoint}: {e}")
             raise
@@ -60,11 +130,10 @@ class MicroserviceClient:
         """
         endpoint = f"{self.omr_url}/health"
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(endpoint)
-                if response.status_code == 200:
-                    body = response.json()
-                    return body.get('status') == 'healthy'
+            response = await self.client.get(endpoint)
+            if response.status_code == 200:
+                body = orjson.loads(response.content)
+                return body.get('status') == 'healthy'
         except Exception as e:
             logger.warning(f"Failed OMR health check at {endpoint}: {e}")
         return False
@@ -76,11 +145,10 @@ class MicroserviceClient:
         """
         endpoint = f"{self.ocr_url}/health"
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(endpoint)
-                if response.status_code == 200:
-                    body = response.json()
-                    return body.get('status') == 'healthy'
+            response = await self.client.get(endpoint)
+            if response.status_code == 200:
+                body = orjson.loads(response.content)
+                return body.get('status') == 'healthy'
         except Exception as e:
             logger.warning(f"Failed OCR health check at {endpoint}: {e}")
         return False
\ No newline at end of file
@@ -3,42 +3,124 @@ omr_ocr.py
 
 Unified OMR and OCR processing module using OpenCV and Tesseract.
 """
+import logging
+import threading
 import cv2
 import numpy as np
 import pytesseract
-import re
-from typing import Dict, Any
-from ..domain.entities import RegionBoundingBox
+from typing import Dict, Any, List, Optional, Tuple
+from ..domain.entities import ANSWER_CHOICES, RegionBoundingBox
+from ..domain.review import is_valid_curp
 
-__all__ = ["grade_scan"]
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
 
-def _get_confidence(data_str: str) -> float:
+__all__ = ["grade_scan", "preload_ocr"]
+
+logger = logging.getLogger(__name__)
+
+OCR_LANG = 'spa'
+# Single text line (name / CURP fields)
+OCR_LINE_CONFIG = '--psm 7'
+# CURP is not dictionary text: restrict recognition to its alphabet and skip the word lists
+CURP_CHARSET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+_FIELD_VARIABLES: Dict[str, Dict[str, str]] = {
+    'nombre': {},
+    'curp': {'tessedit_char_whitelist': CURP_CHARSET, 'load_system_dawg': '0', 'load_freq_dawg': '0'},
+}
+_FIELD_CONFIGS = {
+    field: OCR_LINE_CONFIG + ''.join(f' -c {name}={value}' for name, value in variables.items())
+    for field, variables in _FIELD_VARIABLES.items()
+}
+
+# tesserocr keeps the models loaded between calls instead of starting a tesseract
+# process per field; one API per field and thread, since an API is not thread-safe
+_tess_local = threading.local()
+_use_tesserocr = tesserocr is not None
+
+# Side of the square sampled at each bubble center; fits inside the smallest bubble radius
+BUBBLE_PATCH = 9
+# A bubble counts as marked when its mean brightness is below this fraction of white
+BUBBLE_FILL_THRESHOLD = 0.5
+# Bubble centers closer than this vertically (px) belong to the same row; half of HoughCircles' minDist
+BUBBLE_ROW_TOLERANCE = 10
+
+def _parse_line_data(data_str: str) -> Tuple[str, float]:
     """
-    Parse TSV output from pytesseract.image_to_data and compute average confidence.
-    Returns confidence in [0.0, 1.0].
+    Parse TSV output from pytesseract.image_to_data into the recognized text
+    (words joined by spaces, as image_to_string returns it) and the average
+    word confidence in [0.0, 1.0].
     """
     lines = data_str.strip().splitlines()
     if len(lines) < 2:
-        return 0.0
+        return '', 0.0
     header = lines[0].split("\t")
     try:
         conf_idx = header.index("conf")
+        text_idx = header.index("text")
+    except ValueError:
+        return '', 0.0
+    rows = [parts for parts in (line.split("\t") for line in lines[1:]) if len(parts) > conf_idx]
+    words = [parts[text_idx] for parts in rows if len(parts) > text_idx and parts[text_idx].strip()]
+    # One vectorized parse of the conf column; Tesseract 4.1+ reports float confidences
+    raw = [parts[conf_idx] for parts in rows]
+    try:
+        confs = np.asarray(raw, dtype=np.float64)
+    except ValueError:
+        confs = np.asarray([_parse_conf(value) for value in raw], dtype=np.float64)
+    confs = confs[confs >= 0]
+    conf = float(confs.mean()) / 100.0 if confs.size else 0.0
+    return ' '.join(words), conf
+
+def _parse_conf(value: str) -> float:
+    try:
+        return float(value)
     except ValueError:
-        return 0.0
-    confs = []
-    for line in lines[1:]:
-        parts = line.split("\t")
-        if len(parts) <= conf_idx:
-            continue
+        return -1.0
+
+def _to_gray(image: np.ndarray) -> np.ndarray:
+    """Grayscale view of a crop; crops of an already single-channel image are used as-is."""
+    return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+def _tess_api(field: str) -> Optional["tesserocr.PyTessBaseAPI"]:
+    """This thread's initialized API for a field, or None once tesserocr has failed to load."""
+    global _use_tesserocr
+    apis = getattr(_tess_local, 'apis', None)
+    if apis is None:
+        apis = _tess_local.apis = {}
+    api = apis.get(field)
+    if api is None and _use_tesserocr:
         try:
-            conf = int(parts[conf_idx])
-            if conf >= 0:
-                confs.append(conf)
-        except ValueError:
-            continue
-    if not confs:
-        return 0.0
-    return sum(confs) / len(confs) / 100.0
+            api = tesserocr.PyTessBaseAPI(lang=OCR_LANG, init=False)
+            # load_*_dawg are init-only variables, so they go through InitFull
+            api.InitFull(lang=OCR_LANG, variables=_FIELD_VARIABLES[field])
+            api.SetPageSegMode(tesserocr.PSM.SINGLE_LINE)
+        except RuntimeError as e:
+            logger.warning(f"tesserocr unavailable, falling back to pytesseract: {e}")
+            _use_tesserocr = False
+            return None
+        apis[field] = api
+    return api
+
+def preload_ocr() -> None:
+    """Load the Tesseract models for this thread up front (no-op without tesserocr)."""
+    for field in _FIELD_VARIABLES:
+        _tess_api(field)
+
+def _ocr_line(image: np.ndarray, field: str) -> Tuple[str, float]:
+    """One Tesseract run per field, returning the recognized text and its confidence."""
+    api = _tess_api(field) if _use_tesserocr else None
+    if api is None:
+        # text and confidence both come from a single image_to_data call
+        return _parse_line_data(pytesseract.image_to_data(image, lang=OCR_LANG, config=_FIELD_CONFIGS[field]))
+    image = np.ascontiguousarray(image)
+    h, w = image.shape[:2]
+    api.SetImageBytes(image.tobytes(), w, h, 1, w)
+    text = ' '.join(api.GetUTF8Text().split())
+    confs = np.asarray(api.AllWordConfidences(), dtype=np.float64)
+    return text, float(confs.mean()) / 100.0 if confs.size else 0.0
 
 def extract_fields(image: np.ndarray, regions: Dict[str, RegionBoundingBox]) -> Dict[str, Any]:
     """
@@ -51,12 +133,9 @@ def extract_fields(image: np.ndarray, regions: Dict[str, RegionBoundingBox]) ->
     if nombre_bbox:
         x, y, w, h = nombre_bbox.x, nombre_bbox.y, nombre_bbox.width, nombre_bbox.height
         nombre_img = image[y:y+h, x:x+w]
-        nombre_gray = cv2.cvtColor(nombre_img, cv2.COLOR_BGR2GRAY)
+        nombre_gray = _to_gray(nombre_img)
         nombre_proc = cv2.bilateralFilter(nombre_gray, d=9, sigmaColor=75, sigmaSpace=75)
-        config = '--psm 7'
-        text = pytesseract.image_to_string(nombre_proc, lang='spa', config=config).strip()
-        data = pytesseract.image_to_data(nombre_proc, lang='spa', config=config)
-        conf = _get_confidence(data)
+        text, conf = _ocr_line(nombre_proc, 'nombre')
         results['nombre_text'] = text
         results['nombre_confidence'] = conf
     else:
@@ -67,14 +146,11 @@ def extract_fields(image: np.ndarray, regions: Dict[str, RegionBoundingBox]) ->
     if curp_bbox:
         x, y, w, h = curp_bbox.x, curp_bbox.y, curp_bbox.width, curp_bbox.height
         curp_img = image[y:y+h, x:x+w]
-        curp_gray = cv2.cvtColor(curp_img, cv2.COLOR_BGR2GRAY)
+        curp_gray = _to_gray(curp_img)
         _, curp_proc = cv2.threshold(curp_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        config = '--psm 7'
-        text = pytesseract.image_to_string(curp_proc, lang='spa', config=config).strip().replace(' ', '')
-        data = pytesseract.image_to_data(curp_proc, lang='spa', config=config)
-        conf = _get_confidence(data)
-        pattern = r'^[A-Z]{4}\d{6}[HM][A-Z]{5}\d{2}$'
-        if not re.match(pattern, text):
+        text, conf = _ocr_line(curp_proc, 'curp')
+        text = text.replace(' ', '')
+        if not is_valid_curp(text):
             conf = 0.0
         results['curp_text'] = text
         results['curp_confidence'] = conf
@@ -84,30 +160,72 @@ def extract_fields(image: np.ndarray, regions: Dict[str, RegionBoundingBox]) ->
 
     return results
 
+def bubble_fill_ratios(gray: np.ndarray, centers: np.ndarray, patch: int = BUBBLE_PATCH) -> np.ndarray:
+    """
+    Mean brightness in [0.0, 1.0] of the patch x patch square around each (x, y) center,
+    gathered for all bubbles at once as an (N, patch, patch) fancy-indexed block.
+    """
+    centers = np.asarray(centers, dtype=np.intp).reshape(-1, 2)
+    if not centers.size:
+        return np.zeros(0, dtype=np.float64)
+    h, w = gray.shape[:2]
+    offsets = np.arange(patch) - patch // 2
+    xs = np.clip(centers[:, 0, None, None] + offsets[None, None, :], 0, w - 1)
+    ys = np.clip(centers[:, 1, None, None] + offsets[None, :, None], 0, h - 1)
+    return gray[ys, xs].reshape(len(centers), -1).mean(axis=1) / 255.0
+
+def _detect_bubble_centers(gray: np.ndarray) -> np.ndarray:
+    """Locate bubbles with HoughCircles as an (N, 2) array of (x, y) centers."""
+    blur = cv2.GaussianBlur(gray, (5, 5), 0)
+    circles = cv2.HoughCircles(
+        blur, cv2.HOUGH_GRADIENT, dp=1.2, minDist=20,
+        param1=50, param2=30, minRadius=10, maxRadius=20
+    )
+    if circles is None:
+        return np.zeros((0, 2), dtype=np.intp)
+    return np.rint(circles[0, :, :2]).astype(np.intp)
+
+def _group_questions(centers: np.ndarray) -> List[np.ndarray]:
+    """
+    Indices of the bubbles of each question in reading order: centers within
+    BUBBLE_ROW_TOLERANCE of each other vertically form a row, and each row is read
+    left to right in runs of len(ANSWER_CHOICES) (one run per question column).
+    """
+    if not len(centers):
+        return []
+    by_y = np.argsort(centers[:, 1], kind='stable')
+    breaks = np.flatnonzero(np.diff(centers[by_y, 1]) > BUBBLE_ROW_TOLERANCE) + 1
+    questions = []
+    for row in np.split(by_y, breaks):
+        row = row[np.argsort(centers[row, 0], kind='stable')]
+        questions.extend(np.split(row, range(len(ANSWER_CHOICES), len(row), len(ANSWER_CHOICES))))
+    return questions
+
+def _read_answers(gray: np.ndarray, centers: np.ndarray) -> List[str]:
+    """One letter per question: its darkest bubble if marked, else '' (blank)."""
+    ratios = bubble_fill_ratios(gray, centers)
+    answers = []
+    for bubbles in _group_questions(centers):
+        darkest = int(np.argmin(ratios[bubbles]))
+        answers.append(ANSWER_CHOICES[darkest] if ratios[bubbles[darkest]] < BUBBLE_FILL_THRESHOLD else '')
+    return answers
+
 def grade_scan(image: np.ndarray, regions: Dict[str, RegionBoundingBox]) -> Dict[str, Any]:
     """
-    Perform OMR scoring and OCR field extraction.
-    Returns a dict containing score, answers, total, nombre_text, nombre_confidence, curp_text, curp_confidence.
+    Perform OMR scoring and OCR field extraction on a BGR or grayscale image.
+    Returns a dict containing score, answers, total, nombre_text, nombre_confidence, curp_text, curp_confidence;
+    answers holds one letter per question ('' when blank) and score the number answered.
     """
     fields = extract_fields(image, regions)
     omr_bbox = regions.get('omr')
-    score = 0
-    answers = []
-    total = 0
+    answers: List[str] = []
     if omr_bbox:
         x, y, w, h = omr_bbox.x, omr_bbox.y, omr_bbox.width, omr_bbox.height
         omr_img = image[y:y+h, x:x+w]
-        gray = cv2.cvtColor(omr_img, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
-        circles = cv2.HoughCircles(
-            blur, cv2.HOUGH_GRADIENT, dp=1.2, minDist=20,
-            param1=50, param2=30, minRadius=10, maxRadius=20
-        )
-        if circles is not None:
-            cnt = circles[0].shape[0]
-            total = cnt
-            answers = [True] * cnt
-            score = cnt
+        gray = _to_gray(omr_img)
+        answers = _read_answers(gray, _detect_bubble_centers(gray))
+    score = sum(1 for answer in answers if answer)
+    total = len(answers)
 
     result: Dict[str, Any] = {
         'score': score,
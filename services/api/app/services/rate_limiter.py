@@ -0,0 +1,114 @@
+"""
+Request rate limiting per client: in-process sliding window, or a Redis fixed window
+shared by every worker.
+"""
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Deque, DefaultDict, Tuple
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# Atomic admit check: one round-trip returns {allowed, retry_after_seconds}
+_FIXED_WINDOW_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+if count <= tonumber(ARGV[2]) then
+    return {1, 0}
+end
+return {0, redis.call('TTL', KEYS[1])}
+"""
+
+
+class RateLimiter:
+    """
+    Allows at most `limit` requests per `window` seconds for each (client, endpoint) key.
+    State is per process: each worker enforces its own window.
+    """
+    def __init__(self, limit: int, window: float = 60.0):
+        self.limit = limit
+        self.window = window
+        # Admission times, oldest first; never longer than the limit
+        self.requests: DefaultDict[Tuple[str, str], Deque[float]] = defaultdict(
+            lambda: deque(maxlen=limit)
+        )
+        self._next_sweep = time.monotonic() + window
+
+    def _sweep(self, now: float) -> None:
+        """Forget keys with nothing left in the window, so past clients do not pile up."""
+        idle = [key for key, timestamps in self.requests.items()
+                if not timestamps or now - timestamps[-1] >= self.window]
+        for key in idle:
+            del self.requests[key]
+        self._next_sweep = now + self.window
+
+    def is_allowed(self, client_id: str, endpoint: str) -> bool:
+        # Monotonic clock: wall-clock adjustments cannot reopen or stall the window
+        now = time.monotonic()
+        # At most one sweep per window keeps the cost amortized per request
+        if now >= self._next_sweep:
+            self._sweep(now)
+        timestamps = self.requests[(client_id, endpoint)]
+        while timestamps and now - timestamps[0] >= self.window:
+            timestamps.popleft()
+        if len(timestamps) >= self.limit:
+            return False
+        timestamps.append(now)
+        return True
+
+    def retry_after(self, client_id: str, endpoint: str) -> int:
+        """Seconds until the oldest request in the window expires."""
+        timestamps = self.requests.get((client_id, endpoint))
+        if not timestamps:
+            return 0
+        return max(0, int(self.window - (time.monotonic() - timestamps[0])) + 1)
+
+    async def check(self, client_id: str, endpoint: str) -> Tuple[bool, int]:
+        """Returns (allowed, retry_after_seconds)."""
+        if self.is_allowed(client_id, endpoint):
+            return True, 0
+        return False, self.retry_after(client_id, endpoint)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class RedisRateLimiter:
+    """
+    Fixed-window limit of `limit` requests per `window` seconds, counted in Redis so
+    that all API workers share one budget per client.
+    """
+    def __init__(self, redis_url: str, limit: int, window: int = 60):
+        self.limit = limit
+        self.window = window
+        self._redis = aioredis.from_url(redis_url)
+        # register_script sends EVALSHA and loads the script on first NOSCRIPT
+        self._script = self._redis.register_script(_FIXED_WINDOW_SCRIPT)
+
+    async def check(self, client_id: str, endpoint: str) -> Tuple[bool, int]:
+        """Returns (allowed, retry_after_seconds); fails open if Redis is unreachable."""
+        # Wall clock, not monotonic: window boundaries must agree across processes
+        key = f"rl:{client_id}:{endpoint}:{int(time.time()) // self.window}"
+        try:
+            allowed, retry_after = await self._script(keys=[key], args=[self.window, self.limit])
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable, admitting request: {e}")
+            return True, 0
+        return bool(allowed), int(retry_after)
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+def create_rate_limiter(limit: int, redis_url: str = ""):
+    """Redis-backed limiter when REDIS_URL is set and redis is installed, else in-process."""
+    if redis_url and aioredis is not None:
+        return RedisRateLimiter(redis_url, limit)
+    return RateLimiter(limit)
@@ -1,32 +1,210 @@
 """
 WebSocket connection manager for broadcasting progress updates.
 """
-from typing import List
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+import orjson
 from fastapi import WebSocket
 
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel relaying broadcasts between API worker processes
+BROADCAST_CHANNEL = "bubblegrade:ws"
+
+# Undelivered messages kept per connection; a slower client loses the oldest ones
+OUTBOX_SIZE = 32
+
+# Topic of connections that follow every scan (the dashboard); other topics are scan ids
+ALL_SCANS = "*"
+
+
+class _Subscriber:
+    """A connection's bounded outbox and the task writing it to the socket."""
+    __slots__ = ("websocket", "topic", "outbox", "writer")
+
+    def __init__(self, websocket: WebSocket, topic: str, maxsize: int):
+        self.websocket = websocket
+        self.topic = topic
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.writer: Optional[asyncio.Task] = None
+
+    def push(self, payload: str) -> None:
+        # Progress updates are superseded by later ones, so drop-oldest loses nothing that matters
+        if self.outbox.full():
+            self.outbox.get_nowait()
+        self.outbox.put_nowait(payload)
+
+
 class ConnectionManager:
     """Manages active WebSocket connections and broadcasts messages."""
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, outbox_size: int = OUTBOX_SIZE):
+        self.active_connections: Set[WebSocket] = set()
+        self._outbox_size = outbox_size
+        self._subscribers: Dict[WebSocket, _Subscriber] = {}
+        # Subscribers per topic, so a message only touches the connections that follow it
+        self._groups: Dict[str, Set[_Subscriber]] = {}
+        # Set by start_relay when broadcasts go through Redis instead of straight to local sockets
+        self._redis = None
+        self._relay_task: Optional[asyncio.Task] = None
+        # Latest undelivered message and pending flush task per coalesce key
+        self._pending: Dict[str, dict] = {}
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+        # Set by flush() to end every coalescing window early
+        self._flush_now = asyncio.Event()
+
+    async def start_relay(self, redis_url: str) -> None:
+        """
+        Publish broadcasts on a Redis channel that every API worker subscribes to, so
+        sockets held by sibling processes receive them too. No-op without Redis.
+        """
+        if not redis_url or aioredis is None or self._redis is not None:
+            return
+        self._redis = aioredis.from_url(redis_url)
+        self._relay_task = asyncio.create_task(self._relay())
+
+    async def stop_relay(self) -> None:
+        if self._relay_task is not None:
+            self._relay_task.cancel()
+            self._relay_task = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
 
-    async def connect(self, websocket: WebSocket):
-        """Accept and store a new WebSocket connection."""
+    async def _relay(self):
+        """Deliver messages published by any worker to this worker's sockets."""
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(BROADCAST_CHANNEL)
+                    async for item in pubsub.listen():
+                        if item["type"] == "message":
+                            self._deliver(orjson.loads(item["data"]), item["data"].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Broadcast relay disconnected, resubscribing: {e}")
+                await asyncio.sleep(1)
+
+    async def connect(self, websocket: WebSocket, topic: str = ALL_SCANS):
+        """Accept and store a new WebSocket connection following one scan id or ALL_SCANS."""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
+        subscriber = self._subscribers[websocket] = _Subscriber(websocket, topic, self._outbox_size)
+        self._groups.setdefault(topic, set()).add(subscriber)
+        subscriber.writer = asyncio.create_task(self._write(subscriber))
 
     def disconnect(self, websocket: WebSocket):
-        """Remove a WebSocket connection."""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        """Remove a WebSocket connection and stop its writer."""
+        self.active_connections.discard(websocket)
+        subscriber = self._subscribers.pop(websocket, None)
+        if subscriber is None:
+            return
+        group = self._groups.get(subscriber.topic)
+        if group is not None:
+            group.discard(subscriber)
+            if not group:
+                del self._groups[subscriber.topic]
+        if subscriber.writer is not asyncio.current_task():
+            subscriber.writer.cancel()
+
+    async def broadcast(
+        self, message: dict, coalesce_key: Optional[str] = None,
+        max_delay_ms: int = 50, replaceable: bool = True
+    ):
+        """
+        Send a JSON message to the connections following its scan_id and to
+        those following ALL_SCANS (every connection if it has no scan_id).
+
+        With a coalesce_key, a replaceable message (a progress tick) is held for up
+        to max_delay_ms and replaced by any newer tick for the same key, so a burst
+        of ticks reaches clients as the latest one. A message with replaceable=False
+        (a status change) is never held or replaced: the tick pending for its key,
+        if any, is sent first and then the message itself, so clients see both in order.
+        """
+        if coalesce_key is None:
+            await self._send_all(message)
+            return
+        if not replaceable:
+            pending = self._pending.pop(coalesce_key, None)
+            if pending is not None:
+                await self._send_all(pending)
+            await self._send_all(message)
+            return
+        self._pending[coalesce_key] = message
+        if coalesce_key not in self._flush_tasks:
+            self._schedule_flush(coalesce_key, max_delay_ms / 1000)
+
+    def _schedule_flush(self, key: str, delay: float):
+        self._flush_tasks[key] = asyncio.create_task(self._flush_later(key, delay))
+
+    async def _flush_later(self, key: str, delay: float):
+        """Deliver the latest pending message for a key after the coalescing window."""
+        try:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            message = self._pending.pop(key, None)
+            if message is not None:
+                await self._send_all(message)
+        finally:
+            # The task stays registered until its send is done
+            del self._flush_tasks[key]
+        if key in self._pending:
+            # A newer tick arrived while this one was being sent
+            self._schedule_flush(key, delay)
+
+    async def flush(self):
+        """Send every held tick now and wait until the sends are done (at shutdown)."""
+        self._flush_now.set()
+        try:
+            while self._flush_tasks:
+                await asyncio.gather(*self._flush_tasks.values(), return_exceptions=True)
+        finally:
+            self._flush_now.clear()
+
+    def _recipients(self, message: dict) -> Set[_Subscriber]:
+        scan_id = message.get("scan_id")
+        if scan_id is None:
+            return set(self._subscribers.values())
+        return self._groups.get(ALL_SCANS, set()) | self._groups.get(str(scan_id), set())
+
+    async def _send_all(self, message: dict):
+        if self._redis is not None:
+            # Every worker, this one included, delivers it from the channel
+            try:
+                await self._redis.publish(BROADCAST_CHANNEL, orjson.dumps(message))
+                return
+            except Exception as e:
+                logger.warning(f"Broadcast publish failed, delivering locally only: {e}")
+        if not self._recipients(message):
+            return
+        # Encode once per broadcast; sent as a text frame (clients JSON.parse it)
+        self._deliver(message, orjson.dumps(message).decode())
+
+    def _deliver(self, message: dict, payload: str):
+        # Only enqueues: each connection's writer sends at its own pace, so a slow
+        # client neither delays the others nor buffers more than its outbox
+        for subscriber in self._recipients(message):
+            subscriber.push(payload)
 
-    async def broadcast(self, message: dict):
-        """Send a JSON message to all active connections."""
-        for connection in list(self.active_connections):
+    async def _write(self, subscriber: _Subscriber):
+        """Send a connection's queued messages in order until it fails or disconnects."""
+        while True:
+            payload = await subscriber.outbox.get()
             try:
-                await connection.send_json(message)
+                await subscriber.websocket.send_text(payload)
             except Exception:
                 # Remove closed connections
-                self.disconnect(connection)
+                self.disconnect(subscriber.websocket)
+                return
 
 # Singleton manager instance
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
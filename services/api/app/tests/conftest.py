@@ -0,0 +1,17 @@
+import httpx
+import pytest
+
+from app.main_bubblegrade import app
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def client():
+    # In-process ASGI transport: requests run on the test's event loop, no portal thread.
+    # The lifespan is not run; it would spawn the grading pool and try the database
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from app.domain.entities import ProcessedScan, RegionBoundingBox, ScanStatus, decode_answers, encode_answers
+from app.main_bubblegrade import DocumentOrchestrator, TemplateCreate
+from app.services.omr_ocr import grade_scan
+from app.tests.test_omr import answer_sheet
+
+
+def test_encode_answers_rejects_unexpected_values():
+    assert encode_answers(["A", "", None, "E"]).tolist() == [0, -1, -1, 4]
+    with pytest.raises(ValueError):
+        encode_answers([True, False])
+    with pytest.raises(ValueError):
+        encode_answers(["Z"])
+
+
+def test_graded_answers_survive_finalize(monkeypatch):
+    orchestrator = DocumentOrchestrator()
+
+    async def finalize(scan):
+        return scan
+    monkeypatch.setattr(orchestrator, "_finalize_scan", finalize)
+
+    image = answer_sheet([1, None, 3])
+    h, w = image.shape[:2]
+    result = grade_scan(image, {'omr': RegionBoundingBox(0, 0, w, h)})
+    omr_result = {key: result[key] for key in ('score', 'answers', 'total')}
+    scan = ProcessedScan(id="scan-1", filename="sheet.jpg", status=ScanStatus.PROCESSING)
+
+    scan = asyncio.run(orchestrator._finalize_scan_results(
+        scan, omr_result, {'text': '', 'confidence': 0.0}, {'text': '', 'confidence': 0.0}
+    ))
+
+    assert decode_answers(scan.answers) == ['B', '', 'D']
+    assert scan.score == 2
+    assert scan.total_questions == 3
+
+
+def test_template_answer_key_must_use_answer_choices():
+    template = dict(name="Parcial", description="", total_questions=3)
+    assert TemplateCreate(**template, correct_answers=["A", "C", "E"]).correct_answers == ["A", "C", "E"]
+    for key in (["A", "F", "C"], ["A", "", "C"], ["AB", "C", "D"]):
+        with pytest.raises(ValidationError):
+            TemplateCreate(**template, correct_answers=key)
+
+
+def test_answers_are_stored_only_as_ordinals():
+    from app.infrastructure.mappers import ScanMapper
+
+    scan = ProcessedScan(id="scan-1", filename="upload.jpg", status=ScanStatus.COMPLETED, answers=encode_answers(["B", "", "D"]))
+    row = ScanMapper.to_row(scan)
+    assert "answers" not in row
+    assert row["answers_ord"] == [1, -1, 3]
+    assert decode_answers(ScanMapper.to_entity(ScanMapper.to_model(scan)).answers) == ["B", "", "D"]
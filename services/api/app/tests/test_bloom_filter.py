@@ -0,0 +1,37 @@
+import asyncio
+import hashlib
+
+from app.services.bloom_filter import BloomFilter, BloomFilterRelay
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000)
+    bloom.ready = True
+    digests = [hashlib.sha256(str(i).encode()).digest() for i in range(2000)]
+    for digest in digests[:1000]:
+        bloom.add(digest)
+    assert all(digest in bloom for digest in digests[:1000])
+    false_positives = sum(digest in bloom for digest in digests[1000:])
+    assert false_positives < 20
+
+
+def test_bloom_filter_reports_members_until_ready():
+    bloom = BloomFilter(capacity=10)
+    assert hashlib.sha256(b"new").digest() in bloom
+
+
+def test_bloom_filter_is_never_trusted_without_a_shared_relay():
+    bloom = BloomFilter(capacity=10)
+
+    async def load():
+        bloom.add(hashlib.sha256(b"old").digest())
+
+    async def scenario():
+        relay = BloomFilterRelay(bloom, load)
+        await relay.start("")
+        await relay.publish(hashlib.sha256(b"seen").digest())
+        await relay.aclose()
+
+    asyncio.run(scenario())
+    assert not bloom.ready
+    assert hashlib.sha256(b"new").digest() in bloom
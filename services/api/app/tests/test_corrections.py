@@ -0,0 +1,44 @@
+import pytest
+
+from app import main_bubblegrade
+from app.domain.entities import ProcessedScan, ScanStatus
+from app.infrastructure.database import db_config
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeRepository:
+    def __init__(self, session):
+        self.session = session
+
+    async def get_by_id(self, scan_id):
+        return ProcessedScan(
+            id=scan_id, filename="upload.jpg", status=ScanStatus.NEEDS_REVIEW, file_hash=b"\0" * 32,
+            nombre={"value": "ANA", "needsReview": True}, curp={"value": "", "needsReview": False}
+        )
+
+    async def update(self, scan):
+        self.session.append("updated")
+        return scan
+
+
+async def test_correction_is_cached_only_after_it_commits(client, monkeypatch):
+    events = []
+
+    async def get_session():
+        yield events
+        events.append("committed")
+
+    async def remember_processed_scan(file_hash, scan_id, status):
+        events.append(("cached", status))
+
+    monkeypatch.setattr(main_bubblegrade, "ProcessedScanRepository", FakeRepository)
+    monkeypatch.setattr(main_bubblegrade, "remember_processed_scan", remember_processed_scan)
+    main_bubblegrade.app.dependency_overrides[db_config.get_session] = get_session
+    try:
+        response = await client.patch("/api/v1/scans/scan-1", json={"nombre": {"needsReview": False}})
+    finally:
+        main_bubblegrade.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert events == ["updated", "committed", ("cached", ScanStatus.COMPLETED)]
@@ -0,0 +1,41 @@
+import logging
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services import file_validator
+from app.services.file_validator import FileValidator, HEADER_BYTES
+
+
+def _encode(ext, width, height):
+    ok, buf = cv2.imencode(ext, np.zeros((height, width, 3), np.uint8))
+    assert ok
+    return buf.tobytes()[:HEADER_BYTES]
+
+
+def test_dimensions_read_from_jpeg_and_png_headers():
+    validator = FileValidator()
+    assert validator._read_dimensions_from_header("image/jpeg", _encode(".jpg", 640, 480)) == (640, 480)
+    assert validator._read_dimensions_from_header("image/png", _encode(".png", 300, 900)) == (300, 900)
+
+
+def test_validate_upload_rejects_non_images_and_tiny_images():
+    validator = FileValidator()
+    assert validator.validate_upload(_encode(".jpg", 640, 480)) == (True, None)
+    assert validator.validate_upload(b"%PDF-1.7 not an image")[0] is False
+    is_valid, error = validator.validate_upload(_encode(".png", 50, 50))
+    assert not is_valid and "50x50" in error
+
+
+def test_unknown_hash_algo_fails_instead_of_falling_back():
+    with pytest.raises(ValueError, match="md5"):
+        file_validator._resolve_hash_algo("md5")
+
+
+def test_hash_algo_fallback_is_logged(monkeypatch, caplog):
+    monkeypatch.setitem(file_validator._INSTALLED_HASH_ALGOS, "xxh3", False)
+    monkeypatch.setitem(file_validator._INSTALLED_HASH_ALGOS, "blake3", False)
+    with caplog.at_level(logging.WARNING, logger=file_validator.__name__):
+        assert file_validator._resolve_hash_algo("xxh3") == "sha256"
+    assert "hashing uploads with sha256" in caplog.text
@@ -1,22 +1,17 @@
 import pytest
-from fastapi.testclient import TestClient
 
-# Import the FastAPI app
-from app.main_bubblegrade import app
+pytestmark = pytest.mark.anyio
 
-client = TestClient(app)
-
-def test_health_endpoint():
-    response = client.get("/health")
+async def test_health_endpoint(client):
+    response = await client.get("/health")
     assert response.status_code == 200
     data = response.json()
     assert data.get("status") == "healthy"
 
-def test_metrics_endpoint():
-    response = client.get("/metrics")
+async def test_metrics_endpoint(client):
+    response = await client.get("/metrics")
     assert response.status_code == 200
     content_type = response.headers.get("content-type", "")
     assert content_type.startswith("text/plain")
-    text = response.text
-    # Ensure Prometheus metric counter is present
-    assert "http_requests_total" in text
\ No newline at end of file
+    # Ensure Prometheus metric counter is present (checked on the raw body, no decode)
+    assert b"http_requests_total" in response.content
@@ -0,0 +1,35 @@
+import cv2
+import numpy as np
+
+from app.domain.entities import RegionBoundingBox
+from app.services.omr_ocr import bubble_fill_ratios, grade_scan
+
+
+def answer_sheet(marks):
+    """White sheet with one row of five bubbles per question; marks[i] is the filled column or None"""
+    image = np.full((60 + 50 * len(marks), 300, 3), 255, dtype=np.uint8)
+    for row, mark in enumerate(marks):
+        y = 40 + 50 * row
+        for col in range(5):
+            center = (40 + 50 * col, y)
+            cv2.circle(image, center, 14, (0, 0, 0), 2)
+            if col == mark:
+                cv2.circle(image, center, 10, (0, 0, 0), -1)
+    return image
+
+
+def test_grade_scan_reads_one_letter_per_question():
+    image = answer_sheet([0, 2, None, 4])
+    h, w = image.shape[:2]
+
+    result = grade_scan(image, {'omr': RegionBoundingBox(0, 0, w, h)})
+
+    assert result['answers'] == ['A', 'C', '', 'E']
+    assert result['score'] == 3
+    assert result['total'] == 4
+
+
+def test_bubble_fill_ratios_clip_patches_at_the_border():
+    gray = np.zeros((10, 10), dtype=np.uint8)
+    assert bubble_fill_ratios(gray, np.array([[0, 0], [9, 9]])).tolist() == [0.0, 0.0]
+    assert bubble_fill_ratios(gray, np.zeros((0, 2))).size == 0
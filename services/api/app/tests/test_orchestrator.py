@@ -0,0 +1,57 @@
+import pytest
+
+from app import main_bubblegrade
+from app.domain.entities import ProcessedScan, ScanStatus
+from app.main_bubblegrade import DocumentOrchestrator
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_scan_is_inserted_as_queued_before_it_waits_for_a_slot(monkeypatch):
+    orchestrator = DocumentOrchestrator()
+    inserted = []
+
+    async def create(scan):
+        inserted.append(scan.status)
+        return scan
+
+    monkeypatch.setattr(orchestrator, "_create_scan", create)
+
+    scan = await orchestrator.queue_scan("scan-1", "upload.jpg", b"\0" * 16)
+
+    assert inserted == [ScanStatus.QUEUED]
+    assert scan.status == ScanStatus.QUEUED
+
+
+async def test_pipeline_writes_the_row_once_at_the_terminal_write(monkeypatch, tmp_path):
+    orchestrator = DocumentOrchestrator()
+    events = []
+
+    def scan_repository_scope():
+        raise AssertionError("in-progress states are broadcast, not written")
+
+    async def preprocess(file_path):
+        raise ValueError("Failed to decode image")
+
+    async def finalize(scan):
+        events.append(("finalized", scan.status))
+        return scan
+
+    async def broadcast(message, **kwargs):
+        events.append(("broadcast", message.get("status", message.get("stage"))))
+
+    monkeypatch.setattr(main_bubblegrade, "scan_repository_scope", scan_repository_scope)
+    monkeypatch.setattr(main_bubblegrade.manager, "broadcast", broadcast)
+    monkeypatch.setattr(orchestrator, "_preprocess_and_detect_regions", preprocess)
+    monkeypatch.setattr(orchestrator, "_finalize_scan", finalize)
+
+    scan = ProcessedScan(id="scan-1", filename="upload.jpg", status=ScanStatus.QUEUED)
+    with pytest.raises(ValueError):
+        await orchestrator.process_document(scan, str(tmp_path / "upload.jpg"))
+
+    assert events == [
+        ("broadcast", ScanStatus.PROCESSING),
+        ("broadcast", "preprocessing"),
+        ("finalized", ScanStatus.ERROR),
+        ("broadcast", "ERROR"),
+    ]
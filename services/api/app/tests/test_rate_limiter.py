@@ -0,0 +1,25 @@
+from app.services.rate_limiter import RateLimiter
+
+
+def test_rate_limiter_admits_up_to_limit_per_key():
+    limiter = RateLimiter(limit=2, window=60)
+    assert limiter.is_allowed("10.0.0.1", "upload")
+    assert limiter.is_allowed("10.0.0.1", "upload")
+    assert not limiter.is_allowed("10.0.0.1", "upload")
+    assert limiter.retry_after("10.0.0.1", "upload") > 0
+    # Other clients and endpoints have their own windows
+    assert limiter.is_allowed("10.0.0.2", "upload")
+    assert limiter.is_allowed("10.0.0.1", "export")
+
+
+def test_rate_limiter_window_expires():
+    limiter = RateLimiter(limit=1, window=0)
+    assert limiter.is_allowed("c", "upload")
+    assert limiter.is_allowed("c", "upload")
+
+
+def test_rate_limiter_forgets_idle_clients():
+    limiter = RateLimiter(limit=1, window=0)
+    for i in range(100):
+        assert limiter.is_allowed(f"10.0.0.{i}", "upload")
+    assert len(limiter.requests) == 1
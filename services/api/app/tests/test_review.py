@@ -0,0 +1,18 @@
+from app.domain.review import curp_format_mask, is_valid_curp, review_flags
+
+
+def test_curp_format_mask_matches_single_value_check():
+    values = [
+        "GOMC850101HDFRRR09", " GOMC850101MDFRRR09 ", "GOMC850101XDFRRR09", "",
+        "GOMC850101HDFRRR0", "GOMC850101HDFRRR091", "ÑOMC850101HDFRRR09", "gomc850101hdfrrr09",
+    ]
+    expected = [is_valid_curp(v.strip()) for v in values]
+    assert curp_format_mask(values).tolist() == expected
+
+
+def test_review_flags_combine_confidence_and_format():
+    nombre_review, curp_review = review_flags(
+        [0.95, 0.5, 0.9], [0.95, 0.95, 0.5], ["GOMC850101HDFRRR09", "INVALID", "GOMC850101HDFRRR09"]
+    )
+    assert nombre_review.tolist() == [False, True, False]
+    assert curp_review.tolist() == [False, True, True]
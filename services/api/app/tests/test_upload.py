@@ -1,15 +1,82 @@
-from fastapi.testclient import TestClient
+import pytest
 
-from app.main_bubblegrade import app
+pytestmark = pytest.mark.anyio
 
-client = TestClient(app)
+# Multipart body for a plain-text upload, encoded once for the module
+TEXT_UPLOAD_BOUNDARY = "boundary"
+TEXT_UPLOAD_BODY = (
+    b"--boundary\r\n"
+    b'Content-Disposition: form-data; name="file"; filename="test.txt"\r\n'
+    b"Content-Type: text/plain\r\n"
+    b"\r\n"
+    b"abc\r\n"
+    b"--boundary--\r\n"
+)
 
-def test_upload_invalid_file():
+async def test_upload_invalid_file(client):
     # Upload a non-image file should return 400
-    response = client.post(
+    response = await client.post(
         "/api/v1/scans",
-        files={"file": ("test.txt", b"abc", "text/plain")}
+        content=TEXT_UPLOAD_BODY,
+        headers={"content-type": f"multipart/form-data; boundary={TEXT_UPLOAD_BOUNDARY}"}
     )
     assert response.status_code == 400
     json_data = response.json()
-    assert json_data.get("detail") == "Invalid file type. Only images are supported."
\ No newline at end of file
+    assert json_data.get("detail") == "Invalid file type. Only images are supported."
+
+async def test_upload_oversized_rejected_from_content_length(client):
+    response = await client.post(
+        "/api/v1/scans",
+        files={"file": ("big.jpg", b"\xff\xd8\xff" + b"\0" * (11 * 1024 * 1024), "image/jpeg")}
+    )
+    assert response.status_code == 413
+
+async def test_upload_oversized_without_content_length_rejected_while_spooling(client, tmp_path, monkeypatch):
+    import cv2
+    import numpy as np
+    from app import main_bubblegrade
+
+    monkeypatch.setattr(main_bubblegrade, "UPLOAD_DIR", str(tmp_path))
+    image = cv2.imencode(".jpg", np.zeros((480, 640, 3), np.uint8))[1].tobytes()
+    head = (
+        b"--boundary\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="big.jpg"\r\n'
+        b"Content-Type: image/jpeg\r\n"
+        b"\r\n"
+    ) + image
+
+    async def chunked_body():
+        # A generator body goes out chunked, so only the spooling loop sees the size
+        yield head
+        for _ in range(11):
+            yield b"\0" * (1024 * 1024)
+        yield b"\r\n--boundary--\r\n"
+
+    response = await client.post(
+        "/api/v1/scans",
+        content=chunked_body(),
+        headers={"content-type": f"multipart/form-data; boundary={TEXT_UPLOAD_BOUNDARY}"}
+    )
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+async def test_failed_dedup_lookup_removes_the_spooled_upload(client, tmp_path, monkeypatch):
+    import cv2
+    import numpy as np
+    from app import main_bubblegrade
+
+    async def find_processed_scan(file_hash):
+        raise ConnectionError("cache unavailable")
+
+    monkeypatch.setattr(main_bubblegrade, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(main_bubblegrade, "find_processed_scan", find_processed_scan)
+    image = cv2.imencode(".jpg", np.zeros((480, 640, 3), np.uint8))[1].tobytes()
+
+    response = await client.post("/api/v1/scans", files={"file": ("scan.jpg", image, "image/jpeg")})
+    assert response.status_code == 500
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.parametrize("query", ["limit=-1", "limit=0", "limit=101", "offset=-5"])
+async def test_list_scans_rejects_out_of_range_pagination(client, query):
+    response = await client.get(f"/api/v1/scans?{query}")
+    assert response.status_code == 422
@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+from app.services.ws_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+
+def test_broadcast_coalesces_progress_ticks_per_key():
+    async def scenario():
+        manager = ConnectionManager()
+        ws = FakeWebSocket()
+        await manager.connect(ws)
+        await manager.broadcast({"scan_id": "a", "stage": "preprocessing"}, coalesce_key="a", max_delay_ms=10)
+        await manager.broadcast({"scan_id": "a", "stage": "grading"}, coalesce_key="a", max_delay_ms=10)
+        await manager.broadcast({"scan_id": "b", "stage": "grading"}, coalesce_key="b", max_delay_ms=10)
+        await asyncio.sleep(0.05)
+        return manager, ws.sent
+
+    manager, sent = asyncio.run(scenario())
+    assert sent == [
+        {"scan_id": "a", "stage": "grading"},
+        {"scan_id": "b", "stage": "grading"},
+    ]
+    assert manager._flush_tasks == {}
+
+
+def test_status_messages_are_sent_at_once_after_the_pending_tick():
+    async def scenario():
+        manager = ConnectionManager()
+        ws = FakeWebSocket()
+        await manager.connect(ws)
+        await manager.broadcast({"scan_id": "a", "status": "PROCESSING"}, coalesce_key="a", replaceable=False)
+        await manager.broadcast({"scan_id": "a", "stage": "graded"}, coalesce_key="a", max_delay_ms=1000)
+        await manager.broadcast({"scan_id": "a", "status": "COMPLETED"}, coalesce_key="a", replaceable=False)
+        await asyncio.sleep(0.01)
+        return ws.sent
+
+    assert asyncio.run(scenario()) == [
+        {"scan_id": "a", "status": "PROCESSING"},
+        {"scan_id": "a", "stage": "graded"},
+        {"scan_id": "a", "status": "COMPLETED"},
+    ]
+
+
+def test_flush_sends_held_ticks():
+    async def scenario():
+        manager = ConnectionManager()
+        ws = FakeWebSocket()
+        await manager.connect(ws)
+        await manager.broadcast({"scan_id": "a", "stage": "grading"}, coalesce_key="a", max_delay_ms=1000)
+        await manager.flush()
+        await asyncio.sleep(0.01)
+        return ws.sent
+
+    assert asyncio.run(scenario()) == [{"scan_id": "a", "stage": "grading"}]
+
+
+class ClosedWebSocket(FakeWebSocket):
+    async def send_text(self, data):
+        raise RuntimeError("connection closed")
+
+
+def test_broadcast_prunes_failed_connections():
+    async def scenario():
+        manager = ConnectionManager()
+        ok, closed = FakeWebSocket(), ClosedWebSocket()
+        await manager.connect(ok)
+        await manager.connect(closed)
+        await manager.broadcast({"type": "scan_progress", "scan_id": "a"})
+        await asyncio.sleep(0.01)
+        return manager, ok
+
+    manager, ok = asyncio.run(scenario())
+    assert ok.sent == [{"type": "scan_progress", "scan_id": "a"}]
+    assert manager.active_connections == {ok}
+
+
+class SlowWebSocket(FakeWebSocket):
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+
+    async def send_text(self, data):
+        await self.release.wait()
+        await super().send_text(data)
+
+
+def test_slow_connection_drops_oldest_without_delaying_others():
+    async def scenario():
+        manager = ConnectionManager(outbox_size=2)
+        fast, slow = FakeWebSocket(), SlowWebSocket()
+        await manager.connect(fast)
+        await manager.connect(slow)
+        for i in range(5):
+            await manager.broadcast({"seq": i})
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        fast_sent = list(fast.sent)
+        slow.release.set()
+        await asyncio.sleep(0.01)
+        return fast_sent, slow.sent
+
+    fast_sent, slow_sent = asyncio.run(scenario())
+    assert fast_sent == [{"seq": i} for i in range(5)]
+    # The first message was already in flight; the outbox kept only the newest two
+    assert slow_sent == [{"seq": 0}, {"seq": 3}, {"seq": 4}]
+
+
+def test_broadcast_reaches_only_subscribers_of_the_scan():
+    async def scenario():
+        manager = ConnectionManager()
+        everything, scan_a, scan_b = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await manager.connect(everything)
+        await manager.connect(scan_a, "a")
+        await manager.connect(scan_b, "b")
+        await manager.broadcast({"scan_id": "a", "status": "COMPLETED"})
+        await asyncio.sleep(0.01)
+        return everything.sent, scan_a.sent, scan_b.sent
+
+    everything, scan_a, scan_b = asyncio.run(scenario())
+    assert everything == scan_a == [{"scan_id": "a", "status": "COMPLETED"}]
+    assert scan_b == []